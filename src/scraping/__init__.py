@@ -0,0 +1,8 @@
+"""Scraper of MQL5 trading signals
+
+selenium, pandas and pyarrow are slow to import and most paths need only
+some of them: the http backend never starts a browser, and the journal is
+plain JSON. Modules that use them only in some functions import them
+there, with TYPE_CHECKING imports for the annotations, so --help and the
+light commands load none of them.
+"""
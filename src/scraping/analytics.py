@@ -0,0 +1,87 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .model import SignalFrame
+from .model.account import MONTHS
+
+
+def growth_matrix(frame: SignalFrame) -> tuple[np.ndarray, pd.PeriodIndex]:
+    """Stacks every growth table into one (signals, months) matrix of monthly pct
+
+    Columns are calendar months, from January of the earliest year of the
+    frame to December of the latest, so the same column is the same month for
+    every signal. Months a signal has no value for are NaN.
+
+    The growth table shows 0 for the months of its first year before the
+    signal started and of its last year after the last update. Those leading
+    and trailing zeros are NaN here too; zeros in between are kept as flat
+    months.
+    """
+    n_signals = len(frame)
+    if len(frame.growth_years) == 0:
+        return np.full((n_signals, 0), np.nan), pd.period_range("2000-01", periods=0, freq="M")
+    first_year = int(frame.growth_years.min())
+    n_months = (int(frame.growth_years.max()) - first_year + 1) * len(MONTHS)
+
+    matrix = np.full((n_signals, n_months), np.nan)
+    columns = (frame.growth_years[:, None] - first_year) * len(MONTHS) + np.arange(len(MONTHS))
+    matrix[frame.growth_ids[:, None], columns] = frame.growth_values
+
+    moved = np.nan_to_num(matrix) != 0
+    started = np.maximum.accumulate(moved, axis=1)
+    ongoing = np.maximum.accumulate(moved[:, ::-1], axis=1)[:, ::-1]
+    matrix[~(started & ongoing)] = np.nan
+    return matrix, pd.period_range(f"{first_year}-01", periods=n_months, freq="M")
+
+
+def risk_metrics(matrix: np.ndarray) -> pd.DataFrame:
+    """Return and risk figures of every row of a growth matrix
+
+    - active_months: months with a value
+    - compounded_return: growth over all months, in %
+    - volatility: annualized standard deviation of the monthly returns, in %
+    - max_drawdown: largest fall from a peak of the compounded equity curve, in %
+    - sortino: annualized mean return over annualized downside deviation (NaN
+      without any losing month)
+    - consistency: share of the active months with a positive return
+
+    Rows without any month give NaN (0 active months).
+    """
+    returns = matrix / 100
+    active = ~np.isnan(returns)
+    active_months = active.sum(axis=1)
+
+    equity = np.nancumprod(1 + returns, axis=1)
+    compounded_return = (equity[:, -1] - 1) * 100 if equity.shape[1] else np.full(len(matrix), np.nan)
+    drawdown = equity / np.maximum.accumulate(equity, axis=1) - 1
+    max_drawdown = -drawdown.min(axis=1, initial=0) * 100
+
+    with warnings.catch_warnings(), np.errstate(divide="ignore", invalid="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mean = np.nanmean(returns, axis=1)
+        volatility = np.nanstd(returns, axis=1, ddof=1) * np.sqrt(12) * 100
+        downside = np.sqrt(np.nanmean(np.minimum(returns, 0) ** 2, axis=1)) * np.sqrt(12)
+        sortino = np.where(downside > 0, mean * 12 / downside, np.nan)
+        consistency = (returns > 0).sum(axis=1) / active_months
+
+    no_data = active_months == 0
+    compounded_return[no_data] = np.nan
+    max_drawdown[no_data] = np.nan
+    return pd.DataFrame(
+        {
+            "active_months": active_months,
+            "compounded_return": compounded_return,
+            "volatility": volatility,
+            "max_drawdown": max_drawdown,
+            "sortino": sortino,
+            "consistency": consistency,
+        }
+    )
+
+
+def score(frame: SignalFrame) -> pd.DataFrame:
+    """The scalar fields of every signal with the risk_metrics columns next to them"""
+    matrix, _ = growth_matrix(frame)
+    return pd.concat([frame.signals, risk_metrics(matrix)], axis=1)
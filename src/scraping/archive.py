@@ -0,0 +1,229 @@
+import hashlib
+import json
+import mmap
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator
+
+import zstandard as zstd
+
+from .fetcher import Fetcher
+from .parser import parse_signal
+from .storage import signal_record
+
+
+SIGNAL_URL_RE = re.compile(r"/signals/\d+")
+
+
+class PageArchive:
+    """Content-addressed archive of fetched pages
+
+    Pages are deduplicated by sha256 and stored zstd-compressed, back to back,
+    in a single pack file that is read through mmap. A sqlite index maps every
+    (url, fetch time) to its blob and every blob to its place in the pack.
+
+    Once `train_after` pages are stored, a zstd dictionary is trained on them
+    and used for every later page. The pages share most of their markup, so
+    the dictionary makes each one much smaller than compressing it on its own.
+    Blobs record which dictionary they were compressed with.
+
+    The validators (ETag / Last-Modified) of the last response of a url are
+    kept with the blob they came with, so a later crawl can revalidate the
+    page and reuse the blob when it is unchanged.
+    """
+
+    def __init__(self, directory: Path, level: int = 10, train_after: int = 500, dict_size: int = 1 << 17):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.pack_path = directory / "pages.pack"
+        self.pack_path.touch()
+        self.level = level
+        self.train_after = train_after
+        self.dict_size = dict_size
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(directory / "index.sqlite", check_same_thread=False)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                dict_id INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pages (url TEXT NOT NULL, digest TEXT NOT NULL, fetched_at REAL NOT NULL);
+            CREATE INDEX IF NOT EXISTS pages_url ON pages (url, fetched_at);
+            CREATE TABLE IF NOT EXISTS dictionaries (dict_id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS validators (url TEXT PRIMARY KEY, digest TEXT NOT NULL, headers TEXT NOT NULL);
+            """
+        )
+        self.dictionaries: dict[int, zstd.ZstdCompressionDict] = {
+            dict_id: zstd.ZstdCompressionDict(data)
+            for dict_id, data in self.conn.execute("SELECT dict_id, data FROM dictionaries")
+        }
+        self.view: mmap.mmap | None = None
+
+    def put(self, url: str, page: str, validators: dict[str, str] | None = None) -> str:
+        """Archives a page fetched now, with the validators of its response if it has any"""
+        data = page.encode()
+        digest = hashlib.sha256(data).hexdigest()
+        with self.lock:
+            if not self.conn.execute("SELECT 1 FROM blobs WHERE digest = ?", (digest,)).fetchone():
+                dict_id = self._dict_id()
+                blob = self._compressor(dict_id).compress(data)
+                with open(self.pack_path, "ab") as f:
+                    offset = f.tell()
+                    f.write(blob)
+                self.conn.execute(
+                    "INSERT INTO blobs (digest, offset, length, dict_id) VALUES (?, ?, ?, ?)",
+                    (digest, offset, len(blob), dict_id),
+                )
+            self.conn.execute(
+                "INSERT INTO pages (url, digest, fetched_at) VALUES (?, ?, ?)",
+                (url, digest, time.time()),
+            )
+            if validators:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO validators (url, digest, headers) VALUES (?, ?, ?)",
+                    (url, digest, json.dumps(validators)),
+                )
+            self.conn.commit()
+        return digest
+
+    def validators(self, url: str) -> tuple[dict[str, str], str] | None:
+        """(validators, digest) of the last response of a url that had validators"""
+        with self.lock:
+            row = self.conn.execute("SELECT headers, digest FROM validators WHERE url = ?", (url,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def revalidated(self, url: str, digest: str) -> str:
+        """Records that the page of a blob was still current now, returns the page"""
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO pages (url, digest, fetched_at) VALUES (?, ?, ?)",
+                (url, digest, time.time()),
+            )
+            self.conn.commit()
+        return self.get(digest)
+
+    def get(self, digest: str) -> str:
+        with self.lock:
+            offset, length, dict_id = self.conn.execute(
+                "SELECT offset, length, dict_id FROM blobs WHERE digest = ?", (digest,)
+            ).fetchone()
+            blob = self._view(offset + length)[offset:offset + length]
+        return self._decompressor(dict_id).decompress(blob).decode()
+
+    def latest(self, url: str) -> str | None:
+        """The last archived page of a url"""
+        latest = self.latest_fetch(url)
+        return latest[0] if latest else None
+
+    def latest_fetch(self, url: str) -> tuple[str, float] | None:
+        """The last archived page of a url and its fetch time in epoch seconds"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT digest, fetched_at FROM pages WHERE url = ? ORDER BY fetched_at DESC LIMIT 1", (url,)
+            ).fetchone()
+        return (self.get(row[0]), row[1]) if row else None
+
+    def urls(self) -> list[str]:
+        with self.lock:
+            rows = self.conn.execute("SELECT url FROM pages GROUP BY url ORDER BY MIN(rowid)").fetchall()
+        return [url for url, in rows]
+
+    def train(self) -> int:
+        """Trains a new dictionary on the stored pages, used for the pages stored after it"""
+        with self.lock:
+            digests = [digest for digest, in self.conn.execute(
+                "SELECT digest FROM blobs ORDER BY RANDOM() LIMIT ?", (self.train_after * 2,)
+            )]
+            samples = [self.get(digest).encode() for digest in digests]
+            dictionary = zstd.train_dictionary(self.dict_size, samples)
+            cursor = self.conn.execute("INSERT INTO dictionaries (data) VALUES (?)", (dictionary.as_bytes(),))
+            self.conn.commit()
+            self.dictionaries[cursor.lastrowid] = dictionary
+            return cursor.lastrowid
+
+    def close(self):
+        if self.view is not None:
+            self.view.close()
+        self.conn.close()
+
+    def _dict_id(self) -> int:
+        if self.dictionaries:
+            return max(self.dictionaries)
+        count, = self.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()
+        if count < self.train_after:
+            return 0
+        return self.train()
+
+    def _compressor(self, dict_id: int) -> zstd.ZstdCompressor:
+        if dict_id == 0:
+            return zstd.ZstdCompressor(level=self.level)
+        return zstd.ZstdCompressor(level=self.level, dict_data=self.dictionaries[dict_id])
+
+    def _decompressor(self, dict_id: int) -> zstd.ZstdDecompressor:
+        if dict_id == 0:
+            return zstd.ZstdDecompressor()
+        return zstd.ZstdDecompressor(dict_data=self.dictionaries[dict_id])
+
+    def _view(self, size: int) -> mmap.mmap:
+        # The pack only grows, so remap once a blob lies past the current mapping.
+        if self.view is None or len(self.view) < size:
+            if self.view is not None:
+                self.view.close()
+            with open(self.pack_path, "rb") as f:
+                self.view = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.view
+
+
+class ArchivingFetcher(Fetcher):
+    """Wraps a fetcher and archives every page it returns
+
+    Pages with stored validators are fetched conditionally; when the server
+    answers that a page is unchanged, the archived one is returned.
+    """
+
+    def __init__(self, fetcher: Fetcher, archive: PageArchive):
+        self.fetcher = fetcher
+        self.archive = archive
+
+    def get(self, url: str) -> str:
+        stored = self.archive.validators(url)
+        page, validators = self.fetcher.fetch(url, stored[0] if stored else None)
+        if page is None:
+            return self.archive.revalidated(url, stored[1])
+        self.archive.put(url, page, validators)
+        return page
+
+    def close(self):
+        self.fetcher.close()
+
+
+_archive: PageArchive | None = None
+
+def _open_archive(directory: Path):
+    global _archive
+    _archive = PageArchive(directory)
+
+def _reparse(url: str) -> tuple[str, dict | None, str | None]:
+    try:
+        page, fetched_at = _archive.latest_fetch(url)
+        return url, signal_record(url, parse_signal(page), fetched_at), None
+    except Exception as e:
+        return url, None, repr(e)
+
+def reparse(directory: Path, workers: int | None = None) -> Iterator[tuple[str, dict | None, str | None]]:
+    """Parses the latest archived page of every signal again, across processes
+
+    Yields (url, record, error) in archive order, records as signal_record()
+    gives them with the time the page was fetched. List pages are skipped.
+    """
+    archive = PageArchive(directory)
+    urls = [url for url in archive.urls() if SIGNAL_URL_RE.search(url)]
+    archive.close()
+    with ProcessPoolExecutor(workers, initializer=_open_archive, initargs=(directory,)) as pool:
+        yield from pool.map(_reparse, urls, chunksize=64)
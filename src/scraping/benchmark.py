@@ -0,0 +1,341 @@
+import json
+import multiprocessing as mp
+import random
+import statistics
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from .archive import SIGNAL_URL_RE, PageArchive
+from .parser import parse_signal
+
+# Metrics compared between runs, and whether a higher value is better.
+COMPARED_METRICS = {
+    "pages_per_second": True,
+    "cpu_per_page": False,
+    "peak_rss_mb": False,
+    "failed": False,
+}
+
+
+class _FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, pages: dict[str, bytes], latency: float, jitter: float, error_rate: float, seed: int | None):
+        super().__init__(("127.0.0.1", 0), _FixtureHandler)
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    server: _FixtureServer
+
+    def do_GET(self):
+        server = self.server
+        delay = server.latency + server.random.uniform(0, server.jitter)
+        if delay:
+            time.sleep(delay)
+        if server.random.random() < server.error_rate:
+            self.send_error(503)
+            return
+        body = server.pages.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _serve(directory: Path, ports: mp.Queue, latency: float, jitter: float, error_rate: float, seed: int | None):
+    archive = PageArchive(directory)
+    pages = {}
+    for url in archive.urls():
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        pages[path] = (parts.scheme, parts.netloc, archive.latest(url))
+    archive.close()
+    server = _FixtureServer({}, latency, jitter, error_rate, seed)
+    # Absolute links of the recorded pages are pointed back at this server.
+    local = f"http://127.0.0.1:{server.server_port}"
+    server.pages = {
+        path: page.replace(f"{scheme}://{netloc}", local).encode()
+        for path, (scheme, netloc, page) in pages.items()
+    }
+    ports.put(server.server_port)
+    server.serve_forever()
+
+
+class FixtureServer:
+    """Serves the latest page of every url of a page archive from localhost
+
+    Requests are answered after `latency` plus up to `jitter` seconds, and a
+    share `error_rate` of them fails with a 503. Urls that weren't recorded
+    give a 404. The server runs in its own process, so it doesn't count
+    towards the CPU time of the crawl it serves.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        latency: float = 0.05,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int | None = 0,
+    ):
+        ctx = mp.get_context("spawn")
+        ports = ctx.Queue()
+        self.process = ctx.Process(
+            target=_serve, args=(directory, ports, latency, jitter, error_rate, seed), daemon=True
+        )
+        self.process.start()
+        self.port = ports.get(timeout=60)
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def close(self):
+        self.process.terminate()
+        self.process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ProcessTreeSampler:
+    """Samples CPU time and RSS of this process and all its descendants
+
+    chromedriver is started by this process and Chrome by chromedriver, so
+    the tree covers the browser too. Times are read every `interval` seconds;
+    a process that exits between two samples loses what it used since the
+    last one. RSS is summed over the tree, so pages shared between Chrome's
+    processes count more than once.
+    """
+
+    def __init__(self, interval: float = 0.1):
+        import psutil
+
+        self.root = psutil.Process()
+        self.interval = interval
+        self.cpu: dict[tuple[int, float], float] = {}
+        self.peak_rss = 0
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> "ProcessTreeSampler":
+        self.sample()
+        self.baseline = sum(self.cpu.values())
+        self.thread.start()
+        return self
+
+    def stop(self) -> tuple[float, int]:
+        """(CPU seconds used by the tree since start, peak RSS in bytes)"""
+        self.stopped.set()
+        self.thread.join()
+        self.sample()
+        return sum(self.cpu.values()) - self.baseline, self.peak_rss
+
+    def sample(self):
+        import psutil
+
+        rss = 0
+        for process in [self.root, *self.root.children(recursive=True)]:
+            try:
+                with process.oneshot():
+                    times = process.cpu_times()
+                    # Keyed with the start time, pids get reused.
+                    self.cpu[process.pid, process.create_time()] = times.user + times.system
+                    rss += process.memory_info().rss
+            except psutil.NoSuchProcess:
+                continue
+        self.peak_rss = max(self.peak_rss, rss)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+
+def _trial(backend: str, listing_url: str, limit: int, concurrency: int, rate: float, backoff: float) -> dict:
+    # Runs in a fresh process, so the process tree's CPU time and RSS belong to this backend alone.
+    from .fetcher import ChromeFetcher, HttpFetcher, create_driver
+    from .main import get_signal_links
+    from .scheduler import CrawlScheduler
+    from .scraper import SignalScrapper
+    from .telemetry import Telemetry
+
+    telemetry = Telemetry()
+    if backend == "http":
+        scheduler = CrawlScheduler(concurrency=concurrency, rate=rate, backoff=backoff, telemetry=telemetry)
+        fetcher = HttpFetcher(pool_size=concurrency)
+    elif backend == "chrome":
+        scheduler = CrawlScheduler(concurrency=1, rate=rate, backoff=backoff, telemetry=telemetry)
+        fetcher = ChromeFetcher(create_driver(headless=True))
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+
+    sampler = ProcessTreeSampler().start()
+    started = time.perf_counter()
+    links = get_signal_links(fetcher, limit, scheduler, listing_url)
+    discovered = time.perf_counter()
+    if backend == "http":
+        ss = SignalScrapper(fetcher=fetcher, scheduler=scheduler, telemetry=telemetry)
+    else:
+        ss = SignalScrapper(fetcher.driver, scheduler=scheduler, telemetry=telemetry)
+    signals = ss.scrape(links, close=False)
+    finished = time.perf_counter()
+    cpu_seconds, peak_rss = sampler.stop()
+    ss._close()
+
+    scrape_seconds = finished - discovered
+    summary = telemetry.summary()
+    return {
+        "backend": backend,
+        "links": len(links),
+        "signals": len(signals),
+        "failed": len(links) - len(signals),
+        "discovery_seconds": discovered - started,
+        "scrape_seconds": scrape_seconds,
+        "pages_per_second": len(links) / scrape_seconds if scrape_seconds else 0.0,
+        "cpu_per_page": cpu_seconds / len(links) if links else 0.0,
+        "peak_rss_mb": peak_rss / (1 << 20),
+        "stages": summary["stages"],
+        "counters": summary["counters"],
+    }
+
+
+def parse_times(directory: Path, rounds: int = 3) -> dict:
+    """Distribution of parse_signal times over the signal pages of an archive, in seconds"""
+    archive = PageArchive(directory)
+    pages = [archive.latest(url) for url in archive.urls() if SIGNAL_URL_RE.search(url)]
+    archive.close()
+    times = []
+    for _ in range(rounds):
+        for page in pages:
+            started = time.perf_counter()
+            try:
+                parse_signal(page)
+            except ValueError:
+                continue
+            times.append(time.perf_counter() - started)
+    if len(times) < 2:
+        return {"count": len(times)}
+    percentiles = statistics.quantiles(times, n=100, method="inclusive")
+    return {
+        "count": len(times),
+        "mean": statistics.fmean(times),
+        "p50": percentiles[49],
+        "p90": percentiles[89],
+        "p99": percentiles[98],
+        "max": max(times),
+    }
+
+
+def run_benchmark(
+    directory: Path,
+    backends: list[str],
+    listing_path: str = "/en/signals/mt5",
+    limit: int = 0,
+    concurrency: int = 4,
+    rate: float = 1000,
+    backoff: float = 0.5,
+    latency: float = 0.05,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int | None = 0,
+) -> dict:
+    """Crawls a recorded archive through a FixtureServer with every backend and measures it
+
+    The rate defaults to far above any real host limit, so the numbers show
+    what the scraper itself can do at the given latency.
+    """
+    params = {
+        "listing_path": listing_path,
+        "limit": limit,
+        "concurrency": concurrency,
+        "rate": rate,
+        "backoff": backoff,
+        "latency": latency,
+        "jitter": jitter,
+        "error_rate": error_rate,
+    }
+    trials = []
+    with FixtureServer(directory, latency, jitter, error_rate, seed) as server:
+        for backend in backends:
+            with ProcessPoolExecutor(1, mp_context=mp.get_context("spawn")) as pool:
+                trial = pool.submit(_trial, backend, server.url(listing_path), limit, concurrency, rate, backoff)
+                trials.append(trial.result())
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": _revision(),
+        "params": params,
+        "trials": trials,
+        "parse": parse_times(directory),
+    }
+
+
+def save_result(result: dict, path: Path):
+    with open(path, "a") as f:
+        f.write(json.dumps(result) + "\n")
+
+
+def previous_result(result: dict, path: Path) -> dict | None:
+    """The last stored result run with the same params, to compare against"""
+    if not path.exists():
+        return None
+    previous = None
+    with open(path) as f:
+        for line in f:
+            stored = json.loads(line)
+            if stored["params"] == result["params"]:
+                previous = stored
+    return previous
+
+
+def compare(previous: dict, current: dict) -> list[tuple[str, str, float, float, float]]:
+    """(backend, metric, previous, current, relative change) for every compared metric
+
+    The change is positive when the metric got better.
+    """
+    rows = []
+    previous_trials = {trial["backend"]: trial for trial in previous["trials"]}
+    for trial in current["trials"]:
+        before = previous_trials.get(trial["backend"])
+        if before is None:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = before[metric], trial[metric]
+            change = (new - old) / old if old else 0.0
+            rows.append((trial["backend"], metric, old, new, change if higher_is_better else -change))
+    old, new = previous["parse"].get("p50"), current["parse"].get("p50")
+    if old and new:
+        rows.append(("parse", "p50", old, new, (old - new) / old))
+    return rows
+
+
+def _revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=Path(__file__).parent,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
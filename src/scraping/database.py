@@ -0,0 +1,221 @@
+import math
+import re
+import sqlite3
+from datetime import date
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+
+from .model.account import MONTHS
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+SIGNAL_ID_RE = re.compile(r"/signals/(\d+)")
+
+FILTER_RE = re.compile(r"^\s*(\w+)\s*(<=|>=|!=|=|<|>)\s*(.+?)\s*$")
+
+
+@cache
+def _columns() -> dict[str, str]:
+    """Scalar columns of a signal snapshot with their SQL types, in SCHEMA order
+
+    The url is part of the key and the growth table has its own table.
+    """
+    import pyarrow as pa
+
+    from .storage import SCHEMA
+
+    sql_types = {pa.string(): "TEXT", pa.int64(): "INTEGER", pa.float64(): "REAL"}
+    return {field.name: sql_types[field.type] for field in SCHEMA if field.name not in ("url", "growth_table")}
+
+def __getattr__(name: str):
+    # COLUMNS is built on first access, like storage.SCHEMA.
+    if name == "COLUMNS":
+        return _columns()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def signal_id(url: str) -> int:
+    match = SIGNAL_ID_RE.search(url)
+    if not match:
+        raise ValueError(f"Not a signal url: {url}")
+    return int(match.group(1))
+
+def parse_filter(text: str) -> tuple[str, str, str | float]:
+    """Parses a "column op value" filter such as "reliability>=4" """
+    match = FILTER_RE.match(text)
+    if not match:
+        raise ValueError(f"Invalid filter: {text}")
+    column, op, value = match.groups()
+    columns = _columns()
+    if column not in columns:
+        raise ValueError(f"Unknown column: {column}")
+    return column, op, value if columns[column] == "TEXT" else float(value)
+
+
+class SignalDatabase:
+    """Signal snapshots in sqlite, for screening queries
+
+    Every crawl adds one snapshot per signal, keyed by (snapshot_date,
+    signal_id), with the scalar fields as columns. Growth tables are
+    normalized into a fact table with a row per (snapshot_date, signal_id,
+    year, month). Both are indexed for lookups by snapshot, signal, author
+    and currency, so screening one snapshot doesn't touch the others.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        columns = ",\n".join(f"{name} {sql_type}" for name, sql_type in _columns().items())
+        self.conn.executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS signals (
+                snapshot_date TEXT NOT NULL,
+                signal_id INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                {columns},
+                PRIMARY KEY (snapshot_date, signal_id)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS signals_signal_id ON signals (signal_id, snapshot_date);
+            CREATE INDEX IF NOT EXISTS signals_author ON signals (author, snapshot_date);
+            CREATE INDEX IF NOT EXISTS signals_currency ON signals (currency, snapshot_date);
+            CREATE TABLE IF NOT EXISTS growth (
+                snapshot_date TEXT NOT NULL,
+                signal_id INTEGER NOT NULL,
+                year INTEGER NOT NULL,
+                month INTEGER NOT NULL,
+                pct REAL NOT NULL,
+                PRIMARY KEY (snapshot_date, signal_id, year, month)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS growth_signal_id ON growth (signal_id, snapshot_date);
+            """
+        )
+        # Databases created before a column was added to SCHEMA get it, null for their snapshots.
+        existing = {name for _, name, *_ in self.conn.execute("PRAGMA table_info(signals)")}
+        for name, sql_type in _columns().items():
+            if name not in existing:
+                self.conn.execute(f"ALTER TABLE signals ADD COLUMN {name} {sql_type}")
+        self.conn.commit()
+
+    def add_records(self, records: Iterable[dict], snapshot_date: str | None = None) -> int:
+        """Stores signal_record()s as a snapshot in a single transaction, returns how many
+
+        Loading a crawl's journal once it is complete keeps the database in
+        step with it: a crash leaves the snapshot as it was, and loading the
+        journal again after a resume stores every signal.
+        """
+        count = 0
+        try:
+            for record in records:
+                self.add_record(record["url"], record, snapshot_date)
+                count += 1
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return count
+
+    def add_record(self, url: str, record: dict, snapshot_date: str | None = None):
+        """Stores a signal_record() as the snapshot of its signal, replacing an earlier one of the same date"""
+        snapshot_date = snapshot_date or date.today().isoformat()
+        key = (snapshot_date, signal_id(url))
+        columns = _columns()
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO signals (snapshot_date, signal_id, url, {', '.join(columns)}) "
+            f"VALUES (?, ?, ?, {', '.join('?' * len(columns))})",
+            (*key, url, *(record.get(name) for name in columns)),
+        )
+        self.conn.execute("DELETE FROM growth WHERE snapshot_date = ? AND signal_id = ?", key)
+        self.conn.executemany(
+            "INSERT INTO growth (snapshot_date, signal_id, year, month, pct) VALUES (?, ?, ?, ?, ?)",
+            [
+                (*key, int(year), month, pct)
+                for month, column in zip(range(1, 13), (record["growth_table"].get(name, {}) for name in MONTHS))
+                for year, pct in column.items()
+                if pct is not None and not math.isnan(pct)
+            ],
+        )
+
+    def snapshots(self) -> list[str]:
+        return [snapshot_date for snapshot_date, in self.conn.execute(
+            "SELECT DISTINCT snapshot_date FROM signals ORDER BY snapshot_date"
+        )]
+
+    def screen(
+        self,
+        filters: list[tuple[str, str, str | float]] = (),
+        snapshot_date: str | None = None,
+        author: str | None = None,
+        currency: str | None = None,
+        order_by: str = "growth_total",
+        descending: bool = True,
+        limit: int | None = 50,
+    ) -> "pd.DataFrame":
+        """Signals of one snapshot (the latest by default) matching every filter
+
+        Filters are (column, op, value) as given by parse_filter.
+        """
+        if order_by not in _columns():
+            raise ValueError(f"Unknown column: {order_by}")
+        snapshot_date = snapshot_date or self._latest()
+        conditions = ["snapshot_date = ?"]
+        params: list = [snapshot_date]
+        if author is not None:
+            conditions.append("author = ?")
+            params.append(author)
+        if currency is not None:
+            conditions.append("currency = ?")
+            params.append(currency)
+        for column, op, value in filters:
+            if column not in _columns() or op not in ("<=", ">=", "!=", "=", "<", ">"):
+                raise ValueError(f"Invalid filter: {column} {op}")
+            conditions.append(f"{column} {op} ?")
+            params.append(value)
+        query = (
+            f"SELECT * FROM signals WHERE {' AND '.join(conditions)} "
+            f"ORDER BY {order_by} {'DESC' if descending else 'ASC'}"
+        )
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return self.sql(query, params)
+
+    def history(self, signal_id: int, columns: list[str] = ("growth_total", "subscriber_num", "drawdown_rel_bal")) -> "pd.DataFrame":
+        """Chosen columns of one signal over every snapshot, indexed by snapshot_date"""
+        unknown = set(columns) - _columns().keys()
+        if unknown:
+            raise ValueError(f"Unknown columns: {sorted(unknown)}")
+        frame = self.sql(
+            f"SELECT snapshot_date, {', '.join(columns)} FROM signals WHERE signal_id = ? ORDER BY snapshot_date",
+            (signal_id,),
+        )
+        return frame.set_index("snapshot_date")
+
+    def growth(self, signal_id: int, snapshot_date: str | None = None) -> "pd.DataFrame":
+        """Growth table of one signal in a snapshot (the latest it is in by default), years × months"""
+        if snapshot_date is None:
+            snapshot_date, = self.conn.execute(
+                "SELECT MAX(snapshot_date) FROM signals WHERE signal_id = ?", (signal_id,)
+            ).fetchone()
+        frame = self.sql(
+            "SELECT year, month, pct FROM growth WHERE snapshot_date = ? AND signal_id = ?",
+            (snapshot_date, signal_id),
+        )
+        table = frame.pivot(index="year", columns="month", values="pct").reindex(columns=range(1, 13))
+        table.columns = MONTHS
+        return table
+
+    def sql(self, query: str, params=()) -> "pd.DataFrame":
+        import pandas as pd
+
+        cursor = self.conn.execute(query, params)
+        return pd.DataFrame.from_records(cursor.fetchall(), columns=[column for column, *_ in cursor.description])
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def _latest(self) -> str | None:
+        snapshot_date, = self.conn.execute("SELECT MAX(snapshot_date) FROM signals").fetchone()
+        return snapshot_date
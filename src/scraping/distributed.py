@@ -0,0 +1,253 @@
+import json
+import os
+import socket
+import sqlite3
+import time
+from pathlib import Path
+from typing import Iterator
+
+from .scraper import SignalScrapper
+from .storage import JsonlWriter, from_row, record_url
+
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED = "failed"
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """Urls of a crawl shared by workers on several hosts, leased out in batches
+
+    The queue is a sqlite database on a volume every host mounts. A worker
+    claims a batch of urls with a lease of `lease_timeout` seconds; urls it
+    doesn't report back before the lease expires (the worker died or lost the
+    volume) become claimable again. Each claim counts as an attempt, and a url
+    is given up on after `max_attempts` of them. A url that failed can only be
+    claimed again `retry_delay` seconds later.
+
+    The coordinator also stores the global rate budget and the number of
+    nodes sharing it, so every worker takes the same slice.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        worker: str | None = None,
+        lease_timeout: float = 600,
+        max_attempts: int = 3,
+        retry_delay: float = 300,
+    ):
+        self.path = path
+        self.worker = worker or default_worker_id()
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        # Rollback journal, not WAL: WAL needs shared memory, which network filesystems don't provide.
+        self.conn = sqlite3.connect(path, timeout=60)
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                url TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                lease_owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                reason TEXT,
+                updated_at REAL,
+                retry_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, position);
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            """
+        )
+        # Queues created before failed urls had a retry delay.
+        if "retry_at" not in {name for _, name, *_ in self.conn.execute("PRAGMA table_info(tasks)")}:
+            self.conn.execute("ALTER TABLE tasks ADD COLUMN retry_at REAL")
+        self.conn.commit()
+
+    def add_links(self, urls: list[str]):
+        start = self.conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM tasks").fetchone()[0]
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO tasks (url, position) VALUES (?, ?)",
+            [(url, start + i) for i, url in enumerate(urls)],
+        )
+        self.conn.commit()
+
+    def links(self) -> list[str]:
+        return [url for url, in self.conn.execute("SELECT url FROM tasks ORDER BY position")]
+
+    def set_budget(self, rate: float, nodes: int):
+        """Global requests per second per host, shared by `nodes` workers"""
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [("rate", str(rate)), ("nodes", str(nodes))]
+        )
+        self.conn.commit()
+
+    def rate_slice(self) -> float:
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        return float(meta["rate"]) / int(meta["nodes"])
+
+    def claim(self, n: int) -> list[str]:
+        """Leases up to n urls to this worker, in discovery order"""
+        now = time.time()
+        # IMMEDIATE takes the write lock up front, so two workers never claim the same url.
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                "UPDATE tasks SET status = ?, reason = 'lease expired', lease_owner = NULL, updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND attempts >= ?",
+                (FAILED, now, LEASED, now, self.max_attempts),
+            )
+            urls = [url for url, in self.conn.execute(
+                "SELECT url FROM tasks WHERE attempts < ? AND (status = ? "
+                "OR (status = ? AND (retry_at IS NULL OR retry_at <= ?)) "
+                "OR (status = ? AND lease_expires < ?)) ORDER BY position LIMIT ?",
+                (self.max_attempts, PENDING, FAILED, now, LEASED, now, n),
+            )]
+            self.conn.executemany(
+                "UPDATE tasks SET status = ?, lease_owner = ?, lease_expires = ?, attempts = attempts + 1, "
+                "updated_at = ? WHERE url = ?",
+                [(LEASED, self.worker, now + self.lease_timeout, now, url) for url in urls],
+            )
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return urls
+
+    def extend(self):
+        """Renews the leases this worker holds"""
+        self.conn.execute(
+            "UPDATE tasks SET lease_expires = ? WHERE status = ? AND lease_owner = ?",
+            (time.time() + self.lease_timeout, LEASED, self.worker),
+        )
+        self.conn.commit()
+
+    def mark_done(self, url: str):
+        # A lease that expired and went to another worker isn't ours to complete.
+        self.conn.execute(
+            "UPDATE tasks SET status = ?, lease_owner = NULL, reason = NULL, updated_at = ? "
+            "WHERE url = ? AND status = ? AND lease_owner = ?",
+            (DONE, time.time(), url, LEASED, self.worker),
+        )
+        self.conn.commit()
+
+    def mark_failed(self, url: str, reason: str):
+        now = time.time()
+        self.conn.execute(
+            "UPDATE tasks SET status = ?, lease_owner = NULL, reason = ?, updated_at = ?, retry_at = ? "
+            "WHERE url = ? AND status = ? AND lease_owner = ?",
+            (FAILED, reason, now, now + self.retry_delay, url, LEASED, self.worker),
+        )
+        self.conn.commit()
+
+    def leased(self) -> int:
+        """Number of urls under a live lease, held by any worker"""
+        count, = self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status = ? AND lease_expires >= ?", (LEASED, time.time())
+        ).fetchone()
+        return count
+
+    def waiting(self) -> int:
+        """Number of failed urls that will be retried once their delay is over"""
+        count, = self.conn.execute(
+            "SELECT COUNT(*) FROM tasks WHERE status = ? AND attempts < ? AND retry_at > ?",
+            (FAILED, self.max_attempts, time.time()),
+        ).fetchone()
+        return count
+
+    def summary(self) -> dict[str, int]:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM tasks GROUP BY status"))
+
+    def close(self):
+        self.conn.close()
+
+
+def partition_dir(output_dir: Path, worker: str) -> Path:
+    return output_dir / f"worker={worker}"
+
+def run_worker(
+    queue: WorkQueue,
+    ss: SignalScrapper,
+    output_dir: Path,
+    batch_size: int = 50,
+    poll: float = 30,
+) -> int:
+    """Scrapes leased batches until the queue is drained, returns the number of signals
+
+    Signals go to a new part of the worker's partition under output_dir, one
+    JSON line per signal with its url. A url is marked done once its line is
+    on disk. While other workers still hold leases the worker waits, since
+    their urls come back if they die, and so it does while failed urls wait
+    to be retried.
+    """
+    directory = partition_dir(output_dir, queue.worker)
+    directory.mkdir(parents=True, exist_ok=True)
+    part = len(list(directory.glob("part-*.jsonl")))
+    writer = JsonlWriter(directory / f"part-{part:05d}.jsonl")
+    scraped = 0
+
+    def on_signal(url: str, record: dict):
+        writer.write(record, lambda: queue.mark_done(url))
+        # Progress keeps the rest of the batch leased.
+        queue.extend()
+
+    def on_error(url: str, error: Exception):
+        queue.mark_failed(url, repr(error))
+        # A failure is progress too, the rest of the batch stays leased.
+        queue.extend()
+
+    try:
+        while True:
+            urls = queue.claim(batch_size)
+            if not urls:
+                if not queue.leased() and not queue.waiting():
+                    break
+                time.sleep(poll)
+                continue
+            for _ in ss.iter_scrape(urls, close=False, on_signal=on_signal, on_error=on_error):
+                scraped += 1
+            writer.sync()
+    finally:
+        writer.close()
+    return scraped
+
+def merge_partitions(output_dir: Path, links: list[str]) -> Iterator[dict]:
+    """Records of every worker partition, one per url in the order of links
+
+    A url scraped twice (its lease expired while the first worker was still
+    on it) gives a single record. Lines cut short by a crashed worker are
+    skipped, their urls were retried by the queue.
+
+    Only the place of each url's line is kept in memory, records are read
+    back one at a time.
+    """
+    places = {}
+    for path in sorted(output_dir.glob("worker=*/part-*.jsonl")):
+        with open(path, "rb") as f:
+            offset = 0
+            for line in f:
+                if line.endswith(b"\n"):
+                    url = record_url(line.decode())
+                    if url is not None:
+                        places[url] = (path, offset)
+                offset += len(line)
+    files = {}
+    try:
+        for url in links:
+            if url not in places:
+                continue
+            path, offset = places[url]
+            if path not in files:
+                files[path] = open(path, "rb")
+            files[path].seek(offset)
+            yield from_row(json.loads(files[path].readline()))
+    finally:
+        for f in files.values():
+            f.close()
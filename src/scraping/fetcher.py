@@ -0,0 +1,133 @@
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+import requests
+from requests.adapters import HTTPAdapter
+
+if TYPE_CHECKING:
+    from selenium import webdriver
+
+
+DEFAULT_HEADERS = {
+    "User-Agent": (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+        "(KHTML, like Gecko) Chrome/126.0 Safari/537.36"
+    ),
+    "Accept": "text/html,application/xhtml+xml",
+    "Accept-Encoding": "gzip, deflate",
+    "Accept-Language": "en",
+}
+
+
+class FetchError(Exception):
+
+    def __init__(self, url: str, status: int):
+        super().__init__(f"{url} returned {status}")
+        self.url = url
+        self.status = status
+
+
+class Fetcher(ABC):
+    """Loads a page and returns its html"""
+
+    @abstractmethod
+    def get(self, url: str) -> str:
+        ...
+
+    def fetch(self, url: str, validators: dict[str, str] | None = None) -> tuple[str | None, dict[str, str]]:
+        """Loads a page unless it is unchanged since the response validators were taken from
+
+        Returns (html, validators of this response), html is None when the
+        page is unchanged. Backends without conditional requests always load it.
+        """
+        return self.get(url), {}
+
+    def close(self):
+        pass
+
+
+class HttpFetcher(Fetcher):
+    """Plain HTTP backend
+
+    Connections are kept alive in a pool and responses are gzip encoded.
+    fetch() revalidates a page with If-None-Match / If-Modified-Since, so an
+    unchanged page costs a 304 instead of a full download.
+    """
+
+    def __init__(self, pool_size: int = 10, timeout: float = 30, headers: dict | None = None):
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+
+    def get(self, url: str) -> str:
+        page, _ = self.fetch(url)
+        return page
+
+    def fetch(self, url: str, validators: dict[str, str] | None = None) -> tuple[str | None, dict[str, str]]:
+        response = self.session.get(url, headers=validators, timeout=self.timeout)
+        if response.status_code == 304 and validators:
+            return None, validators
+        if response.status_code >= 400:
+            raise FetchError(url, response.status_code)
+        return response.text, response_validators(response)
+
+    def close(self):
+        self.session.close()
+
+
+def response_validators(response: requests.Response) -> dict[str, str]:
+    """Request headers revalidating the page of a response"""
+    validators = {}
+    if "ETag" in response.headers:
+        validators["If-None-Match"] = response.headers["ETag"]
+    if "Last-Modified" in response.headers:
+        validators["If-Modified-Since"] = response.headers["Last-Modified"]
+    return validators
+
+def create_driver(headless: bool = False) -> "webdriver.Chrome":
+    from selenium import webdriver
+
+    options = webdriver.ChromeOptions()
+    options.add_argument('--blink-settings=imagesEnabled=false')
+    if headless:
+        options.add_argument('--headless=new')
+    return webdriver.Chrome(options=options)
+
+
+class ChromeFetcher(Fetcher):
+    """Browser backend for pages that need JavaScript
+
+    Chrome is only started on the first request, so a fallback that is never
+    used costs nothing.
+    """
+
+    def __init__(self, driver: "webdriver.Chrome | None" = None):
+        self._driver = driver
+
+    @property
+    def driver(self) -> "webdriver.Chrome":
+        if self._driver is None:
+            self._driver = create_driver()
+        return self._driver
+
+    def get(self, url: str) -> str:
+        from selenium.common.exceptions import NoSuchElementException
+        from selenium.webdriver.common.by import By
+
+        self.driver.get(url)
+        if "404" in self.driver.title:
+            raise FetchError(url, 404)
+        # Signal pages render their statistics only once the stats tab is opened.
+        try:
+            stats_tab = self.driver.find_element(By.XPATH, "//li[@id='tab_stats']")
+            self.driver.execute_script("arguments[0].click();", stats_tab)
+        except NoSuchElementException:
+            pass
+        return self.driver.page_source
+
+    def close(self):
+        if self._driver is not None:
+            self._driver.quit()
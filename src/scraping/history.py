@@ -0,0 +1,158 @@
+import io
+import os
+from pathlib import Path
+from typing import Iterator
+from urllib.parse import urlsplit, urlunsplit
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as csv
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .database import signal_id
+from .parser import ParseError
+
+
+# The export of a signal's trading history, relative to the signal url. It is
+# only served to a logged-in session.
+HISTORY_EXPORT_PATH = "/export/history"
+
+HISTORY_HEADER = "Time;Type;Volume;Symbol;Price;S/L;T/P;Time;Price;Commission;Swap;Profit;Comment"
+
+# Parquet has no second resolution, times are kept in ms so they read back unchanged.
+TRADE_SCHEMA = pa.schema(
+    [
+        ("open_time", pa.timestamp("ms")),
+        ("type", pa.dictionary(pa.int32(), pa.string())),
+        ("volume", pa.float64()),
+        ("symbol", pa.dictionary(pa.int32(), pa.string())),
+        ("open_price", pa.float64()),
+        ("sl", pa.float64()),
+        ("tp", pa.float64()),
+        ("close_time", pa.timestamp("ms")),
+        ("close_price", pa.float64()),
+        ("commission", pa.float64()),
+        ("swap", pa.float64()),
+        ("profit", pa.float64()),
+        ("comment", pa.string()),
+    ]
+)
+
+TIME_FORMATS = ["%Y.%m.%d %H:%M:%S", "%Y.%m.%d %H:%M"]
+
+
+def history_url(signal_url: str) -> str:
+    parts = urlsplit(signal_url)
+    return urlunsplit(parts._replace(path=parts.path.rstrip("/") + HISTORY_EXPORT_PATH, query="", fragment=""))
+
+def parse_history(text: str, block_size: int = 1 << 20) -> Iterator[pa.RecordBatch]:
+    """Parses a history export into record batches of TRADE_SCHEMA
+
+    The export is read by Arrow's streaming csv reader a block at a time, so
+    no row ever becomes a Python object. Balance operations have no symbol nor
+    close time, those columns are null for them.
+    """
+    data = text.encode()
+    header = data.split(b"\n", 1)[0].decode().strip()
+    if header.replace(" ", "") != HISTORY_HEADER:
+        raise ParseError("history", f"unexpected header {header[:200]!r}")
+    reader = csv.open_csv(
+        io.BytesIO(data),
+        read_options=csv.ReadOptions(column_names=TRADE_SCHEMA.names, skip_rows=1, block_size=block_size),
+        parse_options=csv.ParseOptions(delimiter=";"),
+        convert_options=csv.ConvertOptions(
+            column_types=TRADE_SCHEMA,
+            timestamp_parsers=TIME_FORMATS,
+            strings_can_be_null=True,
+        ),
+    )
+    try:
+        yield from reader
+    except pa.ArrowInvalid as e:
+        raise ParseError("history", str(e)) from e
+
+def trade_times(table: pa.Table | pa.RecordBatch) -> pa.Array:
+    """Time a trade takes effect: its close, or the operation time for balance rows"""
+    return pc.coalesce(table["close_time"], table["open_time"])
+
+
+class TradeHistory:
+    """Trade histories of signals, as one parquet dataset partitioned by signal
+
+    Every signal has a `signal_id=<id>` directory of parquet parts, each
+    written by one ingestion. Only trades newer than the stored ones are
+    appended, so ingesting a signal again costs one new part with its latest
+    trades, or nothing if it hasn't traded since.
+    """
+
+    def __init__(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.directory = directory
+
+    def signal_dir(self, signal: int) -> Path:
+        return self.directory / f"signal_id={signal}"
+
+    def signal_ids(self) -> list[int]:
+        return sorted(int(path.name.split("=", 1)[1]) for path in self.directory.glob("signal_id=*"))
+
+    def trades(self, signal: int) -> pa.Table:
+        directory = self.signal_dir(signal)
+        if not directory.exists():
+            return TRADE_SCHEMA.empty_table()
+        return pq.read_table(directory, schema=TRADE_SCHEMA)
+
+    def read(self) -> pa.Table:
+        """Trades of every signal, with their signal_id column"""
+        partitioning = ds.partitioning(pa.schema([("signal_id", pa.int64())]), flavor="hive")
+        return pq.read_table(self.directory, partitioning=partitioning)
+
+    def watermark(self, signal: int) -> tuple[int | None, int]:
+        """(time of the last stored trade in epoch ms, number of trades stored at that time)"""
+        directory = self.signal_dir(signal)
+        if not directory.exists():
+            return None, 0
+        times = trade_times(pq.read_table(directory, columns=["open_time", "close_time"])).cast(pa.int64())
+        last = pc.max(times).as_py()
+        if last is None:
+            return None, 0
+        return last, pc.sum(pc.equal(times, last)).as_py()
+
+    def append(self, signal: int, batches: Iterator[pa.RecordBatch]) -> int:
+        """Stores the trades of an export newer than the stored ones, returns how many
+
+        Several trades can close in the same second, so at the time of the
+        last stored trade the ones beyond those already stored count as new.
+        """
+        last, stored_at_last = self.watermark(signal)
+        new = []
+        for batch in batches:
+            if last is None:
+                new.append(batch)
+                continue
+            times = trade_times(batch).cast(pa.int64())
+            at_last = pc.equal(times, last).to_numpy(zero_copy_only=False)
+            keep = pc.greater(times, last).to_numpy(zero_copy_only=False)
+            for i in at_last.nonzero()[0]:
+                if stored_at_last:
+                    stored_at_last -= 1
+                else:
+                    keep[i] = True
+            new.append(batch.filter(pa.array(keep)))
+        table = pa.Table.from_batches(new, schema=TRADE_SCHEMA)
+        if not table.num_rows:
+            return 0
+        directory = self.signal_dir(signal)
+        directory.mkdir(exist_ok=True)
+        part = len(list(directory.glob("part-*.parquet")))
+        path = directory / f"part-{part:05d}.parquet"
+        # A part is renamed into place once complete, so the watermark never counts a partial one.
+        # Dataset reads skip dot files.
+        tmp = path.with_name(f".{path.name}.tmp")
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+        return table.num_rows
+
+    def ingest(self, signal_url: str, text: str) -> int:
+        """Parses a history export of a signal and appends its new trades"""
+        return self.append(signal_id(signal_url), parse_history(text))
@@ -0,0 +1,82 @@
+import sqlite3
+import time
+from pathlib import Path
+
+from .storage import JsonlWriter, format_record, parse_record
+
+
+class SignalSnapshot:
+    """Latest known record of every signal, keyed by signal url
+
+    Each record is stored with the fingerprint of the signal's list-page card
+    at the time it was scraped. A signal whose card is unchanged is carried
+    forward from here instead of being fetched again.
+
+    The cards of the current crawl are staged in the same database, so a
+    resumed crawl still knows the fingerprints to save.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS signals (
+                url TEXT PRIMARY KEY,
+                fingerprint TEXT NOT NULL,
+                record TEXT NOT NULL,
+                scraped_at REAL NOT NULL,
+                verified_at REAL NOT NULL
+            )
+            """
+        )
+        self.conn.execute("CREATE TABLE IF NOT EXISTS cards (url TEXT PRIMARY KEY, fingerprint TEXT NOT NULL)")
+        self.conn.commit()
+
+    def stage(self, cards: dict[str, str]):
+        """Replaces the staged cards with the ones of a new crawl"""
+        self.conn.execute("DELETE FROM cards")
+        self.conn.executemany("INSERT OR REPLACE INTO cards (url, fingerprint) VALUES (?, ?)", cards.items())
+        self.conn.commit()
+
+    def carry_forward(self, output_path: Path) -> list[str]:
+        """Appends the stored records of the unchanged signals to output_path
+
+        Their verified_at is set to now, in the snapshot and in the written
+        records. Returns the urls carried forward.
+        """
+        rows = self.conn.execute(
+            """
+            SELECT signals.url, signals.record FROM cards JOIN signals ON cards.url = signals.url
+            WHERE signals.fingerprint = cards.fingerprint
+            ORDER BY cards.rowid
+            """
+        ).fetchall()
+        now = time.time()
+        # Records saved before they carried their url get it back here.
+        records = [{**parse_record(record), "url": url, "verified_at": now} for url, record in rows]
+        writer = JsonlWriter(output_path)
+        for record in records:
+            writer.write(record)
+        writer.close()
+        self.conn.executemany(
+            "UPDATE signals SET record = ?, verified_at = ? WHERE url = ?",
+            [(format_record(record), now, record["url"]) for record in records],
+        )
+        self.conn.commit()
+        return [url for url, _ in rows]
+
+    def save(self, url: str, record: dict):
+        row = self.conn.execute("SELECT fingerprint FROM cards WHERE url = ?", (url,)).fetchone()
+        # A url without a staged card (the crawl was started without this
+        # snapshot) is saved unfingerprinted, so the next crawl fetches it again.
+        fingerprint = row[0] if row else ""
+        now = record.get("verified_at", time.time())
+        self.conn.execute(
+            "INSERT OR REPLACE INTO signals (url, fingerprint, record, scraped_at, verified_at) VALUES (?, ?, ?, ?, ?)",
+            (url, fingerprint, format_record(record), now, now),
+        )
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
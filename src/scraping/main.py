@@ -1,56 +1,570 @@
-import time
+import math
+import shutil
+from datetime import date
 from pathlib import Path
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit, urlunsplit
 
-import pandas as pd
 from typer import Typer
-from selenium import webdriver
-from selenium.webdriver.common.by import By
 
-from scraping.scraper import SignalScrapper
-from scraping.utils import waf_elements
+if TYPE_CHECKING:
+    from scraping.fetcher import Fetcher
+    from scraping.pool import SignalScrapperPool
+    from scraping.scheduler import CrawlScheduler
+    from scraping.scraper import SignalScrapper
 
 app = Typer()
 
 
-def get_signal_links(driver: webdriver.Chrome, limit: int) -> list[str]:
-    signal_links = []
-    i = 1
-    while True:
-        driver.get(f"https://www.mql5.com/en/signals/mt5/page{i}")
-        if "404" in driver.title:
-            break
-        signal_a_elements = waf_elements(driver, "a.signal-card__wrapper", by=By.CSS_SELECTOR)
-        _signal_links = [a.get_attribute('href') for a in signal_a_elements][:limit]
-        _signal_links = [link for link in _signal_links if link is not None]
-        signal_links += _signal_links
-        if len(signal_links) >= limit:
-            break
-        i += 1
-        time.sleep(20)
-    return signal_links[:limit]
-
-def scraping_signals(driver, signal_links, output_path):
-    ss = SignalScrapper(driver)
-    signals = ss.scrape(signal_links, output_path=output_path)
-    records = [signal.record() for signal in signals]
-    return pd.DataFrame.from_records(records)
+MT5_SIGNALS_URL = "https://www.mql5.com/en/signals/mt5"
+MT4_SIGNALS_URL = "https://www.mql5.com/en/signals/mt4"
+
+
+def listing_page_url(listing_url: str, page: int) -> str:
+    """Url of one page of a signal list, keeping the filters of its query string"""
+    from scraping.parser import PAGE_RE
+
+    parts = urlsplit(listing_url)
+    path = PAGE_RE.sub("", parts.path).rstrip("/")
+    return urlunsplit(parts._replace(path=f"{path}/page{page}"))
+
+def get_signal_cards(
+    fetcher: "Fetcher",
+    limit: int,
+    scheduler: "CrawlScheduler",
+    listing_url: str = MT5_SIGNALS_URL,
+) -> dict[str, str]:
+    """Signal links mapped to the fingerprint of their list-page card, in list order
+
+    The page count is read from the first page, then only the pages needed
+    for `limit` signals (all of them if limit is 0) are fetched concurrently.
+    """
+    from scraping.fetcher import FetchError
+    from scraping.parser import parse_page_count, parse_signal_cards
+
+    first_url = listing_page_url(listing_url, 1)
+    first_page = scheduler.call(first_url, fetcher.get)
+    signal_cards = parse_signal_cards(first_page, first_url)
+    page_count = parse_page_count(first_page)
+    if limit and signal_cards:
+        page_count = min(page_count, math.ceil(limit / len(signal_cards)))
+
+    urls = [listing_page_url(listing_url, page) for page in range(2, page_count + 1)]
+    pages = {}
+    for url, page_source, error in scheduler.iter_results(urls, fetcher.get):
+        if error is not None:
+            if isinstance(error, FetchError) and error.status == 404:
+                continue
+            raise error
+        pages[url] = parse_signal_cards(page_source, url)
+    for url in urls:
+        for link, fingerprint in pages.get(url, {}).items():
+            signal_cards.setdefault(link, fingerprint)
+
+    if limit:
+        signal_cards = dict(list(signal_cards.items())[:limit])
+    return signal_cards
+
+def get_signal_links(
+    fetcher: "Fetcher",
+    limit: int,
+    scheduler: "CrawlScheduler",
+    listing_url: str = MT5_SIGNALS_URL,
+) -> list[str]:
+    return list(get_signal_cards(fetcher, limit, scheduler, listing_url))
+
+def discover_cards(
+    fetcher: "Fetcher",
+    limit: int,
+    scheduler: "CrawlScheduler",
+    listing_urls: list[str],
+) -> dict[str, str]:
+    """get_signal_cards of every signal list, a link listed twice keeps its first card"""
+    signal_cards = {}
+    for listing_url in listing_urls:
+        for link, fingerprint in get_signal_cards(fetcher, limit, scheduler, listing_url).items():
+            signal_cards.setdefault(link, fingerprint)
+    return signal_cards
+
+def discover_links(
+    fetcher: "Fetcher",
+    limit: int,
+    scheduler: "CrawlScheduler",
+    listing_urls: list[str],
+) -> list[str]:
+    return list(discover_cards(fetcher, limit, scheduler, listing_urls))
+
+def scraping_signals(ss: "SignalScrapper | SignalScrapperPool", signal_links, output_path, state=None, on_signal=None):
+    from scraping.typed import typed_frame
+
+    signals = ss.scrape(signal_links, output_path=output_path, state=state, on_signal=on_signal)
+    return typed_frame(signal.record() for signal in signals)
 
 @app.command()
 def main(
     limit: int = 3,
     output_dat_path: Path = Path("output.dat"),
     output_csv_path: Path = Path("output.csv"),
+    page_source: bool = False,
+    backend: str = "http",
+    chrome_fallback: bool = True,
+    concurrency: int = 4,
+    rate: float = 0.5,
+    workers: int = 1,
+    recycle_after: int = 50,
+    state_path: Path | None = None,
+    max_retries: int = 3,
+    snapshot_path: Path | None = None,
+    output_parquet_dir: Path | None = None,
+    archive_dir: Path | None = None,
+    listing_url: list[str] = [MT5_SIGNALS_URL],
+    metrics_path: Path | None = None,
+    summary_path: Path | None = None,
+    database_path: Path | None = None,
+):
+    """Scrape signals
+
+    Signals are discovered from the --listing-url signal lists (MT5 by
+    default; MT4 and filtered list urls work too, the option can be repeated).
+    --limit caps the number of signals per list, 0 takes every signal.
+
+    The http backend loads pages without a browser and only starts Chrome for
+    pages that can't be parsed from the plain html (unless --no-chrome-fallback).
+    The chrome backend drives a single Chrome instance for everything, so it
+    ignores --concurrency; with --workers above 1 it runs one Chrome per worker
+    process instead, restarting each after --recycle-after pages.
+    --rate is the number of requests per second per host.
+
+    Progress is checkpointed in --state-path (output.dat.state by default).
+    Running again with the same paths resumes the crawl: done urls are skipped
+    and failed ones retried up to --max-retries times.
+
+    With --snapshot-path the crawl is incremental: only signals whose list-page
+    card changed since the snapshot are fetched, the others are copied from
+    the snapshot into output.dat. Every record has a verified_at time, when
+    it was scraped or last copied forward.
+
+    output.dat is a JSON Lines journal. The csv has a column per field, typed
+    as scraping.typed declares, with the growth tables as growth_YYYY_MM
+    columns. With --output-parquet-dir the crawl is also written as a
+    snapshot_date=YYYY-MM-DD partition of a parquet dataset.
+
+    With --archive-dir every page loaded by the http backend (and its Chrome
+    fallback) is kept in a compressed page archive, see the reparse command.
+    Archived pages are requested again conditionally, and one the server
+    reports unchanged is taken from the archive.
+
+    Stage latencies (fetch, wait, parse per section, write), throughput and
+    failures by kind are written at the end of the run: as a Prometheus text
+    file to --metrics-path and as a JSON summary to --summary-path.
+
+    With --database-path every signal of output.dat is also stored as today's
+    snapshot in a sqlite database at the end of the run, see the query command.
+    """
+    from scraping.archive import ArchivingFetcher, PageArchive
+    from scraping.fetcher import ChromeFetcher, HttpFetcher
+    from scraping.incremental import SignalSnapshot
+    from scraping.scheduler import CrawlScheduler
+    from scraping.scraper import SignalScrapper
+    from scraping.state import CrawlState
+    from scraping.storage import ParquetWriter, iter_records
+    from scraping.telemetry import Telemetry
+    from scraping.typed import write_csv
+
+    state_path = state_path or output_dat_path.with_name(f"{output_dat_path.name}.state")
+    if output_dat_path.exists() and not state_path.exists():
+        raise FileExistsError(f"{output_dat_path} already exists.")
+    state = CrawlState(state_path)
+
+    snapshot = SignalSnapshot(snapshot_path) if snapshot_path else None
+    archive = PageArchive(archive_dir) if archive_dir else None
+    snapshot_date = date.today().isoformat()
+    telemetry = Telemetry()
+
+    if backend == "chrome":
+        scheduler = CrawlScheduler(concurrency=1, rate=rate, telemetry=telemetry)
+        fetcher = ChromeFetcher()
+    elif backend == "http":
+        scheduler = CrawlScheduler(concurrency=concurrency, rate=rate, telemetry=telemetry)
+        fetcher = HttpFetcher(pool_size=concurrency)
+        if archive is not None:
+            fetcher = ArchivingFetcher(fetcher, archive)
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+
+    if not state.links():
+        signal_cards = discover_cards(fetcher, limit, scheduler, listing_url)
+        state.add_links(list(signal_cards))
+        if snapshot is not None:
+            snapshot.stage(signal_cards)
+            for url in snapshot.carry_forward(output_dat_path):
+                state.mark_done(url)
+
+    if backend == "chrome" and workers > 1:
+        from scraping.pool import SignalScrapperPool
+
+        fetcher.close()
+        ss = SignalScrapperPool(
+            workers, page_source=page_source, recycle_after=recycle_after, rate=rate, telemetry=telemetry
+        )
+    elif backend == "chrome":
+        ss = SignalScrapper(fetcher.driver, page_source=page_source, scheduler=scheduler, telemetry=telemetry)
+    else:
+        fallback = ChromeFetcher() if chrome_fallback else None
+        if fallback is not None and archive is not None:
+            fallback = ArchivingFetcher(fallback, archive)
+        ss = SignalScrapper(fetcher=fetcher, fallback=fallback, scheduler=scheduler, telemetry=telemetry)
+
+    on_signal = snapshot.save if snapshot is not None else None
+    for _ in ss.iter_scrape(state.pending(max_retries), output_path=output_dat_path, state=state, on_signal=on_signal):
+        pass
+    state.close()
+    if archive is not None:
+        archive.close()
+    if metrics_path is not None:
+        telemetry.write_prometheus(metrics_path)
+    if summary_path is not None:
+        telemetry.write_json(summary_path)
+
+    # The csv covers the whole journal, including signals scraped by earlier runs.
+    output_csv_path.unlink(missing_ok=True)
+    if output_dat_path.exists():
+        write_csv(output_csv_path, output_dat_path)
+
+    if output_parquet_dir and output_dat_path.exists():
+        # The partition is rebuilt from the whole journal, so a resumed crawl replaces it.
+        partition = output_parquet_dir / f"snapshot_date={snapshot_date}"
+        shutil.rmtree(partition, ignore_errors=True)
+        writer = ParquetWriter(partition)
+        for record in iter_records(output_dat_path):
+            writer.write(record)
+        writer.close()
+
+    if database_path and output_dat_path.exists():
+        from scraping.database import SignalDatabase
+
+        # Also rebuilt from the whole journal, so no signal checkpointed by a crashed run is missing.
+        database = SignalDatabase(database_path)
+        database.add_records(iter_records(output_dat_path), snapshot_date)
+        database.close()
+
+@app.command()
+def coordinate(
+    queue_path: Path,
+    limit: int = 3,
+    rate: float = 0.5,
+    nodes: int = 1,
+    listing_url: list[str] = [MT5_SIGNALS_URL],
+):
+    """Discover signals into a work queue for worker commands on several hosts
+
+    --queue-path is a sqlite database on a volume every worker mounts. --rate
+    is the global budget of requests per second per host, each of the --nodes
+    workers gets an equal slice of it.
+    """
+    from scraping.distributed import WorkQueue
+    from scraping.fetcher import HttpFetcher
+    from scraping.scheduler import CrawlScheduler
+
+    queue = WorkQueue(queue_path)
+    queue.set_budget(rate, nodes)
+    scheduler = CrawlScheduler(rate=rate)
+    fetcher = HttpFetcher()
+    links = discover_links(fetcher, limit, scheduler, listing_url)
+    fetcher.close()
+    queue.add_links(links)
+    print(queue.summary())
+    queue.close()
+
+@app.command()
+def worker(
+    queue_path: Path,
+    output_dir: Path,
+    worker_id: str | None = None,
+    batch_size: int = 50,
+    lease_timeout: float = 600,
+    max_attempts: int = 3,
+    retry_delay: float = 300,
+    backend: str = "http",
+    chrome_fallback: bool = True,
+    page_source: bool = False,
+    concurrency: int = 4,
+    metrics_path: Path | None = None,
+):
+    """Scrape batches leased from a coordinate queue until it is drained
+
+    Signals go to a worker=<id> partition of --output-dir, see the merge
+    command. The worker fetches at its slice of the coordinator's rate. A
+    batch not reported back within --lease-timeout seconds is handed to
+    another worker. A url that failed is retried --retry-delay seconds later,
+    up to --max-attempts attempts.
+    """
+    from scraping.distributed import WorkQueue, run_worker
+    from scraping.fetcher import ChromeFetcher, HttpFetcher
+    from scraping.scheduler import CrawlScheduler
+    from scraping.scraper import SignalScrapper
+    from scraping.telemetry import Telemetry
+
+    queue = WorkQueue(
+        queue_path, worker_id, lease_timeout=lease_timeout, max_attempts=max_attempts, retry_delay=retry_delay
+    )
+    telemetry = Telemetry()
+    if backend == "chrome":
+        scheduler = CrawlScheduler(concurrency=1, rate=queue.rate_slice(), telemetry=telemetry)
+        fetcher = ChromeFetcher()
+        ss = SignalScrapper(fetcher.driver, page_source=page_source, scheduler=scheduler, telemetry=telemetry)
+    elif backend == "http":
+        scheduler = CrawlScheduler(concurrency=concurrency, rate=queue.rate_slice(), telemetry=telemetry)
+        fallback = ChromeFetcher() if chrome_fallback else None
+        ss = SignalScrapper(
+            fetcher=HttpFetcher(pool_size=concurrency), fallback=fallback, scheduler=scheduler, telemetry=telemetry
+        )
+    else:
+        raise ValueError(f"Unknown backend: {backend}")
+
+    scraped = run_worker(queue, ss, output_dir, batch_size=batch_size)
+    ss._close()
+    print(f"{queue.worker}: {scraped} signals, queue {queue.summary()}")
+    queue.close()
+    if metrics_path is not None:
+        telemetry.write_prometheus(metrics_path)
+
+@app.command()
+def merge(
+    queue_path: Path,
+    output_dir: Path,
+    output_dat_path: Path = Path("output.dat"),
+    output_csv_path: Path = Path("output.csv"),
+    output_parquet_dir: Path | None = None,
+):
+    """Consolidate the worker partitions of a distributed crawl into output.dat and the csv
+
+    Signals are written once each, in discovery order. With --output-parquet-dir
+    the crawl also becomes a snapshot_date=YYYY-MM-DD partition, as with main.
+    """
+    from scraping.distributed import WorkQueue, merge_partitions
+    from scraping.storage import JsonlWriter, ParquetWriter
+    from scraping.typed import write_csv
+
+    if output_dat_path.exists():
+        raise FileExistsError(f"{output_dat_path} already exists.")
+
+    queue = WorkQueue(queue_path)
+    links = queue.links()
+    summary = queue.summary()
+    queue.close()
+
+    output_csv_path.unlink(missing_ok=True)
+    writer = JsonlWriter(output_dat_path)
+    parquet_writer = None
+    if output_parquet_dir is not None:
+        partition = output_parquet_dir / f"snapshot_date={date.today().isoformat()}"
+        shutil.rmtree(partition, ignore_errors=True)
+        parquet_writer = ParquetWriter(partition)
+    merged = 0
+    for record in merge_partitions(output_dir, links):
+        writer.write(record)
+        if parquet_writer is not None:
+            parquet_writer.write(record)
+        merged += 1
+    writer.close()
+    write_csv(output_csv_path, output_dat_path)
+    if parquet_writer is not None:
+        parquet_writer.close()
+    print(f"{merged} of {len(links)} signals merged, queue {summary}")
+
+@app.command()
+def reparse(
+    archive_dir: Path,
+    output_dat_path: Path = Path("output.dat"),
+    output_csv_path: Path = Path("output.csv"),
+    workers: int | None = None,
 ):
+    """Rebuild output.dat and the csv from a page archive, without network access"""
+    from tqdm import tqdm
+
+    from scraping.archive import reparse as reparse_archive
+    from scraping.storage import JsonlWriter
+    from scraping.typed import write_csv
 
     if output_dat_path.exists():
         raise FileExistsError(f"{output_dat_path} already exists.")
 
-    options = webdriver.ChromeOptions()
-    options.add_argument('--blink-settings=imagesEnabled=false')
-    driver = webdriver.Chrome(options=options)
-    signal_links = get_signal_links(driver, limit)
-    signals = scraping_signals(driver, signal_links, output_dat_path)
-    signals.to_csv(f"{output_csv_path}", index=False)
+    output_csv_path.unlink(missing_ok=True)
+    writer = JsonlWriter(output_dat_path)
+    for _, record, error in tqdm(reparse_archive(archive_dir, workers)):
+        if error is None:
+            writer.write(record)
+    writer.close()
+    write_csv(output_csv_path, output_dat_path)
+
+@app.command()
+def query(
+    database_path: Path,
+    where: list[str] = [],
+    snapshot_date: str | None = None,
+    author: str | None = None,
+    currency: str | None = None,
+    order_by: str = "growth_total",
+    ascending: bool = False,
+    limit: int = 50,
+    columns: list[str] = ["signal_id", "name", "author", "currency", "reliability", "growth_total", "drawdown_rel_bal", "subscriber_num"],
+    history: int | None = None,
+    sql: str | None = None,
+):
+    """Screen the signals of a snapshot in a --database-path database
+
+    --where takes filters like "reliability>=4" or "drawdown_rel_bal<20" and
+    can be repeated. The latest snapshot is used unless --snapshot-date is set.
+    --history SIGNAL_ID shows one signal over every snapshot instead, and --sql
+    runs a query of your own.
+    """
+    from scraping.database import SignalDatabase, parse_filter
+
+    database = SignalDatabase(database_path)
+    if sql is not None:
+        frame = database.sql(sql)
+    elif history is not None:
+        frame = database.history(history)
+    else:
+        frame = database.screen(
+            [parse_filter(text) for text in where],
+            snapshot_date=snapshot_date,
+            author=author,
+            currency=currency,
+            order_by=order_by,
+            descending=not ascending,
+            limit=limit,
+        )[columns]
+    database.close()
+    print(frame.to_string(index=history is not None))
+
+@app.command()
+def history(
+    history_dir: Path,
+    limit: int = 50,
+    concurrency: int = 4,
+    rate: float = 0.5,
+    listing_url: list[str] = [MT5_SIGNALS_URL],
+    signal_url: list[str] = [],
+    cookie: str | None = None,
+):
+    """Ingest the trade history of signals into a parquet dataset
+
+    Downloads the history export of every --signal-url, or of the signals of
+    the --listing-url lists if none is given, and appends the trades newer
+    than those already in --history-dir. The export is only served to a
+    logged-in session, pass its cookies with --cookie.
+    """
+    from tqdm import tqdm
+
+    from scraping.fetcher import DEFAULT_HEADERS, HttpFetcher
+    from scraping.history import TradeHistory, history_url
+    from scraping.scheduler import CrawlScheduler
+
+    trade_history = TradeHistory(history_dir)
+    scheduler = CrawlScheduler(concurrency=concurrency, rate=rate)
+    headers = {**DEFAULT_HEADERS, "Cookie": cookie} if cookie else None
+    fetcher = HttpFetcher(pool_size=concurrency, headers=headers)
+    links = list(dict.fromkeys(signal_url))
+    if not links:
+        links = discover_links(fetcher, limit, scheduler, listing_url)
+
+    def _ingest(url: str) -> int:
+        return trade_history.ingest(url, fetcher.get(history_url(url)))
+
+    trades = 0
+    for url, added, error in tqdm(scheduler.iter_results(links, _ingest), total=len(links)):
+        if error is not None:
+            print(f"{url}: {error!r}")
+        else:
+            trades += added
+    fetcher.close()
+    print(f"{trades} new trades from {len(links)} signals")
+
+@app.command()
+def record(
+    archive_dir: Path,
+    limit: int = 50,
+    concurrency: int = 4,
+    rate: float = 0.5,
+    listing_url: list[str] = [MT5_SIGNALS_URL],
+):
+    """Record list and signal pages into a page archive, for the benchmark command
+
+    Only fetches pages, nothing is parsed or written besides the archive.
+    """
+    from tqdm import tqdm
+
+    from scraping.archive import ArchivingFetcher, PageArchive
+    from scraping.fetcher import HttpFetcher
+    from scraping.scheduler import CrawlScheduler
+
+    archive = PageArchive(archive_dir)
+    scheduler = CrawlScheduler(concurrency=concurrency, rate=rate)
+    fetcher = ArchivingFetcher(HttpFetcher(pool_size=concurrency), archive)
+    links = discover_links(fetcher, limit, scheduler, listing_url)
+    for _, _, error in tqdm(scheduler.iter_results(links, fetcher.get), total=len(links)):
+        if error is not None:
+            print(f"{error!r}")
+    fetcher.close()
+    archive.close()
+
+@app.command()
+def benchmark(
+    archive_dir: Path,
+    results_path: Path = Path("benchmarks.jsonl"),
+    backend: list[str] = ["http"],
+    listing_path: str = "/en/signals/mt5",
+    limit: int = 0,
+    concurrency: int = 4,
+    rate: float = 1000,
+    backoff: float = 0.5,
+    latency: float = 0.05,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+):
+    """Measure the scraper offline against pages recorded with the record command
+
+    The archive is served from a local server that adds --latency (plus up to
+    --jitter) seconds to every response and fails --error-rate of them with a
+    503. Discovery and scraping run once per --backend, each in a fresh
+    process. The result is appended to --results-path and compared with the
+    last stored run with the same options.
+    """
+    from scraping.benchmark import compare, previous_result, run_benchmark, save_result
+
+    result = run_benchmark(
+        archive_dir,
+        backend,
+        listing_path=listing_path,
+        limit=limit,
+        concurrency=concurrency,
+        rate=rate,
+        backoff=backoff,
+        latency=latency,
+        jitter=jitter,
+        error_rate=error_rate,
+    )
+    previous = previous_result(result, results_path)
+    save_result(result, results_path)
+
+    for trial in result["trials"]:
+        print(
+            f"{trial['backend']}: {trial['signals']}/{trial['links']} signals, "
+            f"{trial['pages_per_second']:.2f} pages/s, {trial['cpu_per_page'] * 1000:.1f} ms cpu/page, "
+            f"peak rss {trial['peak_rss_mb']:.0f} MB"
+        )
+    parse = result["parse"]
+    if "p50" in parse:
+        print(
+            f"parse_signal: p50 {parse['p50'] * 1000:.2f} ms, p90 {parse['p90'] * 1000:.2f} ms, "
+            f"p99 {parse['p99'] * 1000:.2f} ms over {parse['count']} pages"
+        )
+    if previous is not None:
+        print(f"compared with {previous['revision']} ({previous['timestamp']}):")
+        for name, metric, old, new, change in compare(previous, result):
+            print(f"  {name} {metric}: {old:.4g} -> {new:.4g} ({change:+.1%})")
 
 if __name__ == "__main__":
     app()
@@ -9,4 +9,13 @@ __all__ = [
     "SignalTop",
     "SignalAccount",
     "SignalStats",
+    "SignalFrame",
 ]
+
+
+def __getattr__(name: str):
+    # SignalFrame needs pandas and pyarrow, load them only when it is used.
+    if name == "SignalFrame":
+        from .frame import SignalFrame
+        return SignalFrame
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
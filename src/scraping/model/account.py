@@ -1,13 +1,34 @@
 import ast
-import pandas as pd
+import math
+import sys
+import numpy as np
 
-from typing import Union
+from typing import TYPE_CHECKING, Union
 
+if TYPE_CHECKING:
+    import pandas as pd
 
-GrothTableInput = Union[pd.DataFrame, str, list, dict]
+
+GrothTableInput = Union["pd.DataFrame", str, list, dict]
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
 
 
 class SignalAccount:
+    """Account figures and monthly growth table of a signal
+
+    The growth table is kept as a (years,) int array and a (years, 12) float
+    array instead of a DataFrame; `growth_table` builds the DataFrame on access.
+    """
+
+    __slots__ = ("growth_total", "growth_ave", "deposit", "withdrawal", "growth_years", "growth_values")
+
+    growth_total: float
+    growth_ave: float
+    deposit: float
+    withdrawal: float
+    growth_years: np.ndarray
+    growth_values: np.ndarray
 
     def __init__(
         self,
@@ -21,56 +42,56 @@ class SignalAccount:
         self.growth_ave = growth_ave
         self.deposit = deposit
         self.withdrawal = withdrawal
-        self.growth_table = self.format_growth_table(growth_table)
+        self.growth_years, self.growth_values = self.format_growth_table(growth_table)
+
+    @property
+    def growth_table(self) -> "pd.DataFrame":
+        import pandas as pd
+
+        return pd.DataFrame(
+            self.growth_values,
+            index=pd.Index(self.growth_years, name="year"),
+            columns=MONTHS,
+        )
 
     def record(self) -> dict:
+        years = self.growth_years.tolist()
         return {
             "growth_total": self.growth_total,
             "growth_ave": self.growth_ave,
             "deposit": self.deposit,
             "withdrawal": self.withdrawal,
-            "growth_table": self.growth_table.to_dict(),
+            "growth_table": {
+                month: dict(zip(years, column))
+                for month, column in zip(MONTHS, self.growth_values.T.tolist())
+            },
         }
 
     def get_growth_table(self):
         return self.growth_table
 
-    def format_growth_table(self, value: GrothTableInput) -> pd.DataFrame:
-        columns = [
-            "year",
-            "Jan",
-            "Feb",
-            "Mar",
-            "Apr",
-            "May",
-            "Jun",
-            "Jul",
-            "Aug",
-            "Sep",
-            "Oct",
-            "Nov",
-            "Dec",
-        ]
-        if isinstance(value, pd.DataFrame):
-            return value
+    def format_growth_table(self, value: GrothTableInput) -> tuple[np.ndarray, np.ndarray]:
+        """Converts a growth table to (years, values) arrays
+
+        Accepts a DataFrame indexed by year with month columns, rows of
+        [year, Jan, ..., Dec] (or their repr), or a {month: {year: pct}} dict
+        as written by record().
+        """
+        if _is_frame(value):
+            years = value.index.to_numpy()
+            values = value.reindex(columns=MONTHS).to_numpy(dtype=np.float64)
         elif isinstance(value, str):
             value = value.replace("\n", ",")
-            value = ast.literal_eval(value)
-            df = pd.DataFrame(value)
-            df.columns = columns
-            df.set_index("year", inplace=True)
-            return df
+            return self.format_growth_table(list(ast.literal_eval(value)))
         elif isinstance(value, list):
-            df = pd.DataFrame(value)
-            df.columns = columns
-            df.rename_axis("year", inplace=True)
-            return df
+            years = [row[0] for row in value]
+            values = [[_none_to_nan(pct) for pct in row[1:]] for row in value]
         elif isinstance(value, dict):
-            df = pd.DataFrame.from_dict(value)
-            df.rename_axis("year", inplace=True)
-            return df
+            years = list(dict.fromkeys(year for column in value.values() for year in column))
+            values = [[_none_to_nan(value.get(month, {}).get(year)) for month in MONTHS] for year in years]
         else:
             raise TypeError(f"Not supported type: {type(value)}")
+        return np.array(years, dtype=np.int64), np.array(values, dtype=np.float64).reshape(-1, 12)
 
     @classmethod
     def from_record(cls, record: dict):
@@ -82,3 +103,13 @@ class SignalAccount:
             withdrawal=record["withdrawal"],
             growth_table=growth_table,
         )
+
+
+def _is_frame(value) -> bool:
+    # Anything that is a DataFrame was built after pandas got imported, so the
+    # check doesn't need to import it.
+    pd = sys.modules.get("pandas")
+    return pd is not None and isinstance(value, pd.DataFrame)
+
+def _none_to_nan(value: float | None) -> float:
+    return math.nan if value is None else value
@@ -0,0 +1,105 @@
+from typing import Iterable, Iterator
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .account import MONTHS, SignalAccount, _none_to_nan
+from .signal import Signal
+from .stats import SignalStats
+from .top import SignalTop
+
+
+class SignalFrame:
+    """A collection of signals held column-wise
+
+    Scalar fields live in one wide DataFrame with a row per signal. All growth
+    tables share three arrays with a row per (signal, year): the signal
+    position, the year and the 12 monthly percentages. Rows are grouped by
+    signal, so the growth table of one signal is a slice of those arrays.
+    """
+
+    def __init__(self, signals: pd.DataFrame, growth_ids: np.ndarray, growth_years: np.ndarray, growth_values: np.ndarray):
+        self.signals = signals.reset_index(drop=True)
+        self.growth_ids = growth_ids
+        self.growth_years = growth_years
+        self.growth_values = growth_values
+
+    def __len__(self) -> int:
+        return len(self.signals)
+
+    def __getitem__(self, signal_id: int) -> Signal:
+        record = self.signals.iloc[signal_id].to_dict()
+        account = SignalAccount(
+            growth_total=record["growth_total"],
+            growth_ave=record["growth_ave"],
+            deposit=record["deposit"],
+            withdrawal=record["withdrawal"],
+            growth_table=self.growth_table(signal_id),
+        )
+        return Signal(SignalTop.from_record(record), account, SignalStats.from_record(record))
+
+    def __iter__(self) -> Iterator[Signal]:
+        for signal_id in range(len(self)):
+            yield self[signal_id]
+
+    def growth_table(self, signal_id: int) -> pd.DataFrame:
+        """Growth table of one signal, shaped like SignalAccount.growth_table, without copying"""
+        start, stop = np.searchsorted(self.growth_ids, [signal_id, signal_id + 1])
+        return pd.DataFrame(
+            self.growth_values[start:stop],
+            index=pd.Index(self.growth_years[start:stop], name="year"),
+            columns=MONTHS,
+            copy=False,
+        )
+
+    def growth_long(self) -> pd.Series:
+        """All growth tables as one series of pct indexed by (signal_id, year, month)"""
+        n_rows = len(self.growth_ids)
+        index = pd.MultiIndex.from_arrays(
+            [
+                np.repeat(self.growth_ids, 12),
+                np.repeat(self.growth_years, 12),
+                np.tile(np.arange(1, 13, dtype=np.int8), n_rows),
+            ],
+            names=["signal_id", "year", "month"],
+        )
+        return pd.Series(self.growth_values.reshape(-1), index=index, name="pct").dropna()
+
+    @classmethod
+    def from_records(cls, records: Iterable[dict]) -> "SignalFrame":
+        """Builds the frame from Signal.record() dicts"""
+        rows = []
+        ids: list[int] = []
+        years: list[int] = []
+        values: list[list[float]] = []
+        for signal_id, record in enumerate(records):
+            growth_table = record["growth_table"]
+            rows.append({key: value for key, value in record.items() if key != "growth_table"})
+            for year in sorted({year for column in growth_table.values() for year in column}):
+                ids.append(signal_id)
+                years.append(int(year))
+                values.append([_none_to_nan(growth_table.get(month, {}).get(year)) for month in MONTHS])
+        return cls(
+            pd.DataFrame.from_records(rows),
+            np.array(ids, dtype=np.int64),
+            np.array(years, dtype=np.int64),
+            np.array(values, dtype=np.float64).reshape(-1, 12),
+        )
+
+    @classmethod
+    def from_table(cls, table: pa.Table) -> "SignalFrame":
+        """Builds the frame from an Arrow table of stored rows (growth_table as {year, months} lists)
+
+        The nested growth column is flattened by Arrow, without a Python loop per signal.
+        """
+        growth_table = table.column("growth_table").combine_chunks()
+        growth_rows = pc.list_flatten(growth_table)
+        months = pc.list_flatten(pc.struct_field(growth_rows, "months"))
+        return cls(
+            table.drop_columns(["growth_table"]).to_pandas(),
+            pc.list_parent_indices(growth_table).to_numpy().astype(np.int64),
+            pc.struct_field(growth_rows, "year").to_numpy(zero_copy_only=False).astype(np.int64),
+            months.to_numpy(zero_copy_only=False).astype(np.float64).reshape(-1, 12),
+        )
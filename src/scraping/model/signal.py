@@ -5,6 +5,12 @@ from .stats import SignalStats
 
 class Signal:
 
+    __slots__ = ("top", "account", "stats")
+
+    top: SignalTop
+    account: SignalAccount
+    stats: SignalStats
+
     def __init__(
         self,
         top: SignalTop,
@@ -31,3 +37,9 @@ class Signal:
         account = SignalAccount.from_record(record)
         stats = SignalStats.from_record(record)
         return cls(top, account, stats)
+
+    @classmethod
+    def from_records(cls, records):
+        """Loads many records at once into a SignalFrame"""
+        from .frame import SignalFrame
+        return SignalFrame.from_records(records)
@@ -1,11 +1,95 @@
+FIELDS = (
+    "trades",
+    "profit_trades",
+    "loss_trades",
+    "best_trade",
+    "worst_trade",
+    "gross_profit",
+    "gross_loss",
+    "max_consecutive_wins",
+    "max_consecutive_profit",
+    "sharpe_ratio",
+    "trading_activity",
+    "max_deposit_load",
+    "latest_trade",
+    "trades_per_week",
+    "avg_holding_time",
+    "recovery_factor",
+    "long_trades",
+    "short_trades",
+    "profit_factor",
+    "expected_payoff",
+    "average_profit",
+    "average_loss",
+    "max_consecutive_losses",
+    "max_consecutive_loss",
+    "monthly_growth",
+    "annual_forecast",
+    "algo_trading",
+    "drawdown_abs",
+    "drawdown_max",
+    "drawdown_rel_bal",
+    "drawdown_rel_equ",
+    "pair",
+)
+
+
 class SignalStats:
+    """Figures of the stats tab
+
+    Every field is a parsed number (minutes for durations), or None when the
+    page doesn't show it, except `pair` which is the symbol string.
+    """
+
+    __slots__ = FIELDS
+
+    trades: float | None
+    profit_trades: float | None
+    loss_trades: float | None
+    best_trade: float | None
+    worst_trade: float | None
+    gross_profit: float | None
+    gross_loss: float | None
+    max_consecutive_wins: float | None
+    max_consecutive_profit: float | None
+    sharpe_ratio: float | None
+    trading_activity: float | None
+    max_deposit_load: float | None
+    latest_trade: float | None
+    trades_per_week: float | None
+    avg_holding_time: float | None
+    recovery_factor: float | None
+    long_trades: float | None
+    short_trades: float | None
+    profit_factor: float | None
+    expected_payoff: float | None
+    average_profit: float | None
+    average_loss: float | None
+    max_consecutive_losses: float | None
+    max_consecutive_loss: float | None
+    monthly_growth: float | None
+    annual_forecast: float | None
+    algo_trading: float | None
+    drawdown_abs: float | None
+    drawdown_max: float | None
+    drawdown_rel_bal: float | None
+    drawdown_rel_equ: float | None
+    pair: str | None
 
     def __init__(self, **stats):
-        self.stats = stats
+        unknown = stats.keys() - set(FIELDS)
+        if unknown:
+            raise TypeError(f"Unknown stats: {sorted(unknown)}")
+        for field in FIELDS:
+            setattr(self, field, stats.get(field))
+
+    @property
+    def stats(self) -> dict:
+        return self.record()
 
     def record(self) -> dict:
-        return self.stats
+        return {field: getattr(self, field) for field in FIELDS}
 
     @classmethod
     def from_record(cls, record: dict):
-        return cls(**record)
+        return cls(**{field: record.get(field) for field in FIELDS})
@@ -1,5 +1,27 @@
 class SignalTop:
 
+    __slots__ = (
+        "name",
+        "author",
+        "rating",
+        "rating_num",
+        "reliability",
+        "week",
+        "subscriber_num",
+        "subscriber_funds",
+        "currency",
+    )
+
+    name: str
+    author: str
+    rating: float
+    rating_num: int
+    reliability: int
+    week: int
+    subscriber_num: int
+    subscriber_funds: int
+    currency: str
+
     def __init__(
         self,
         name: str,
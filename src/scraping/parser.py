@@ -0,0 +1,310 @@
+import hashlib
+import math
+import re
+from contextlib import contextmanager
+from typing import Any, Callable
+
+from lxml import html
+from lxml.html import HtmlElement
+
+from .model import (
+    Signal,
+    SignalTop,
+    SignalAccount,
+    SignalStats,
+)
+from .model.account import MONTHS
+from .values import DIGITS_RE, extract_float, extract_suffixed, parse_value
+
+
+TOP_XPATHS = {
+    "name": "//div[@class='s-line-card__title']",
+    "author": "//div[@class='s-line-card__author']",
+    "rating": "//div[@class='s-line-card__rating rating-area']/div",
+    "rating_num": "//div[@class='s-line-card__rating rating-area']",
+    "reliability": "//div[@class='s-indicators__item s-indicators__item_risk']/div",
+    "week": "//span[@class='s-indicators__item-desc s-indicators__item-desc_weeks']",
+    "subscriber_num": "//div[@class='s-indicators__item-wrapper  s-indicators__item-wrapper_subscribers']/span[2]",
+    "subscriber_funds": "//div[@class='s-indicators__item-wrapper  s-indicators__item-wrapper_subscribers']/span[3]",
+    "currency": "//div[@class='chart-bar_horiz__value']",
+}
+
+STATS_ITEMS = {
+    "Trades:": "trades",
+    "Profit Trades:": "profit_trades",
+    "Loss Trades:": "loss_trades",
+    "Best trade:": "best_trade",
+    "Worst trade: ": "worst_trade",
+    "Gross Profit:": "gross_profit",
+    "Gross Loss:": "gross_loss",
+    "Maximum consecutive wins:": "max_consecutive_wins",
+    "Maximal consecutive profit:": "max_consecutive_profit",
+    "Sharpe Ratio:": "sharpe_ratio",
+    "Trading activity:": "trading_activity",
+    "Max deposit load:": "max_deposit_load",
+    "Latest trade:": "latest_trade",
+    "Trades per week:": "trades_per_week",
+    "Avg holding time:": "avg_holding_time",
+    "Recovery Factor:": "recovery_factor",
+    "Long Trades:": "long_trades",
+    "Short Trades:": "short_trades",
+    "Profit Factor:": "profit_factor",
+    "Expected Payoff:": "expected_payoff",
+    "Average Profit:": "average_profit",
+    "Average Loss:": "average_loss",
+    "Maximum consecutive losses:": "max_consecutive_losses",
+    "Maximal consecutive loss:": "max_consecutive_loss",
+    "Monthly growth:": "monthly_growth",
+    "Annual Forecast:": "annual_forecast",
+    "Algo trading:": "algo_trading",
+    "Absolute": "drawdown_abs",
+    "Maximal": "drawdown_max",
+    "By Balance": "drawdown_rel_bal",
+    "By Equity": "drawdown_rel_equ",
+}
+
+STATS_LABEL_XPATH = "//div[contains(@class, 's-data-columns__label')]"
+STATS_VALUE_XPATH = "./following-sibling::div[contains(@class, 's-data-columns__value')]"
+PAIR_XPATH = "//td[@class='col-symbol']"
+
+# Reads every stats label/value pair, the growth indicators and the growth
+# table in one round trip to the browser. Mirrors the XPaths above: a label
+# is matched on its own first text node, its value is the next value sibling.
+SIGNAL_DATA_SCRIPT = """
+const text = (el) => el ? el.innerText.trim() : null;
+const ownText = (el) => {
+    for (const node of el.childNodes) {
+        if (node.nodeType === Node.TEXT_NODE) return node.textContent;
+    }
+    return "";
+};
+const labels = [];
+for (const label of document.querySelectorAll("div[class*='s-data-columns__label']")) {
+    let value = label.nextElementSibling;
+    while (value && !(value.tagName === "DIV" && value.className.includes("s-data-columns__value"))) {
+        value = value.nextElementSibling;
+    }
+    labels.push([ownText(label), text(value)]);
+}
+const chart = document.getElementById("growth_chart");
+const table = chart && chart.querySelector("table");
+const headerRows = table ? [...table.querySelectorAll("thead > tr")] : [];
+return JSON.stringify({
+    labels: labels,
+    indicators: chart ? [...chart.querySelectorAll(".svg-chart__indicator-value")].map((el) => text(el.querySelector("div"))) : [],
+    header: headerRows.length ? [...headerRows[headerRows.length - 1].querySelectorAll("th")].map(text) : [],
+    rows: table ? [...table.querySelectorAll("tbody > tr")].map((tr) => [...tr.querySelectorAll("td")].map(text)) : [],
+    pair: text(document.querySelector("td[class='col-symbol']")),
+});
+"""
+
+
+RELIABILITY_RE = re.compile(r"rel(\d)")
+PAGE_RE = re.compile(r"/page(\d+)")
+CURRENCY_RE = re.compile(r"(\w+)")
+
+
+def format_rating(rating_str: str) -> float:
+    rating = DIGITS_RE.search(rating_str)
+    if not rating:
+        return 0.0
+    return int(rating.group(1)) / 10
+
+def format_rating_num(rating_num_str: str) -> int:
+    rating_num = DIGITS_RE.search(rating_num_str)
+    if not rating_num:
+        raise ValueError("Rating num not found")
+    return int(rating_num.group(1))
+
+def format_reliability(reliability_str: str) -> int:
+    reliability = RELIABILITY_RE.search(reliability_str)
+    if not reliability:
+        raise ValueError("Reliability not found")
+    return int(reliability.group(1))
+
+def format_week(week_str: str) -> int:
+    week = DIGITS_RE.search(week_str)
+    if not week:
+        raise ValueError("Week not found")
+    return int(week.group(1))
+
+def format_subscriber_funds(subscriber_funds_str: str) -> int:
+    try:
+        return extract_suffixed(subscriber_funds_str)
+    except ValueError:
+        raise ValueError("Subscriber funds not found")
+
+def format_currency(currency_str: str) -> str:
+    currency = CURRENCY_RE.search(currency_str)
+    if not currency:
+        raise ValueError("Currency not found")
+    return currency.group(1)
+
+def growth_table_rows(header: list[str], body: list[list[float]]) -> list[list[float]]:
+    """Rows of [year, Jan, ..., Dec] from the growth table, NaN for a month it has no column for
+
+    The year is in the column with an empty header, the yearly total
+    ("Year" column) is left out.
+    """
+    year = header.index("")
+    months = [header.index(month) if month in header else None for month in MONTHS]
+    return [[int(row[year]), *(math.nan if i is None else row[i] for i in months)] for row in body]
+
+
+class ParseError(ValueError):
+    """A field of a signal page couldn't be read"""
+
+    def __init__(self, field: str, reason: str):
+        super().__init__(f"{field}: {reason}")
+        self.field = field
+
+
+@contextmanager
+def _field(field: str):
+    """Reports a failure to read the field as a ParseError naming it"""
+    try:
+        yield
+    except ParseError:
+        raise
+    except (ValueError, IndexError, KeyError) as e:
+        raise ParseError(field, str(e)) from e
+
+def _top_field(root: HtmlElement, field: str, format: Callable[[str], Any] = str, attribute: str | None = None):
+    with _field(field):
+        element = _first(root, TOP_XPATHS[field])
+        return format((element.get(attribute) or "") if attribute else _text(element))
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+def _text(element: HtmlElement) -> str:
+    """Text of an element, whitespace-normalized like WebElement.text"""
+    return " ".join(element.text_content().split())
+
+def _first(root: HtmlElement, xpath: str) -> HtmlElement:
+    found = root.xpath(xpath)
+    if not found:
+        raise ValueError(f"Element not found: {xpath}")
+    return found[0]
+
+
+def parse_top(root: HtmlElement) -> SignalTop:
+    name = _top_field(root, "name")
+    author = _top_field(root, "author")
+    rating = _top_field(root, "rating", format_rating, attribute="class")
+    rating_num = _top_field(root, "rating_num", format_rating_num)
+    # The reliability factor may not be present. In that case, treat it as -1.
+    try:
+        reliability = _top_field(root, "reliability", format_reliability, attribute="class")
+    except ParseError:
+        reliability = -1
+    week = _top_field(root, "week", format_week)
+    subscriber_num = _top_field(root, "subscriber_num", int)
+    subscriber_funds = _top_field(root, "subscriber_funds", format_subscriber_funds)
+    currency = _top_field(root, "currency", format_currency)
+
+    return SignalTop(
+        name=name,
+        author=author,
+        rating=rating,
+        rating_num=rating_num,
+        reliability=reliability,
+        week=week,
+        subscriber_num=subscriber_num,
+        subscriber_funds=subscriber_funds,
+        currency=currency,
+    )
+
+def account_from_growth(indicators: list[str], header: list[str], rows: list[list[str]]) -> SignalAccount:
+    """Builds the account from the texts of the growth indicators and the growth table cells"""
+    with _field("growth_total"):
+        growth_total = extract_float(indicators[0])
+    with _field("growth_ave"):
+        growth_ave = extract_float(indicators[1])
+    with _field("deposit"):
+        deposit = extract_float(indicators[2]) if len(indicators) >= 3 else 0
+    with _field("withdrawal"):
+        withdrawal = extract_float(indicators[3]) if len(indicators) >= 4 else 0
+    with _field("growth_table"):
+        body = [[float(cell.replace("%", "") or 0) for cell in row] for row in rows]
+        growth_table = growth_table_rows(header, body)
+
+    return SignalAccount(
+        growth_total=growth_total,
+        growth_ave=growth_ave,
+        deposit=deposit,
+        withdrawal=withdrawal,
+        growth_table=growth_table,
+    )
+
+def stats_from_labels(labels: list[tuple[str, str | None]], pair: str) -> SignalStats:
+    """Builds the stats from the (label text, value text) pairs of the stats tab
+
+    The first label containing the text of a STATS_ITEMS entry gives its value,
+    entries without one are None.
+    """
+    stats = {}
+    for label, key in STATS_ITEMS.items():
+        value = next((value for text, value in labels if label in text), None)
+        stats[key] = parse_value(value.strip()) if value is not None else None
+
+    stats["pair"] = pair
+
+    return SignalStats(**stats)
+
+def parse_account(root: HtmlElement) -> SignalAccount:
+    with _field("growth_chart"):
+        growth_chart = _first(root, "//*[@id='growth_chart']")
+        header_divs = growth_chart.xpath(f".//*[{_has_class('svg-chart__indicator-value')}]")
+        indicators = [_text(div.xpath(".//div")[0]) for div in header_divs]
+
+    with _field("growth_table"):
+        table = _first(growth_chart, ".//table")
+    header: list[str] = []
+    for row in table.xpath("./thead/tr"):
+        header = [_text(th) for th in row.xpath(".//th")]
+    rows = [[_text(td) for td in row.xpath(".//td")] for row in table.xpath("./tbody/tr")]
+
+    return account_from_growth(indicators, header, rows)
+
+def parse_stats(root: HtmlElement) -> SignalStats:
+    labels = []
+    for item_label in root.xpath(STATS_LABEL_XPATH):
+        item_value = item_label.xpath(STATS_VALUE_XPATH)
+        labels.append((item_label.xpath("string(text())"), _text(item_value[0]) if item_value else None))
+
+    with _field("pair"):
+        pair = _text(_first(root, PAIR_XPATH))
+
+    return stats_from_labels(labels, pair)
+
+def parse_signal(page_source: str) -> Signal:
+    """Extracts a Signal from the html of a signal page in a single pass
+
+    The page source must be taken after the stats tab has been activated,
+    so that it contains the same content the WebDriver path reads.
+    """
+    root = html.fromstring(page_source)
+    top = parse_top(root)
+    account = parse_account(root)
+    stats = parse_stats(root)
+    return Signal(top=top, account=account, stats=stats)
+
+def parse_signal_cards(page_source: str, base_url: str) -> dict[str, str]:
+    """Maps the link of every signal card on a signal list page to a fingerprint of the card
+
+    The fingerprint covers the figures the card shows (growth, subscribers,
+    weeks, ...), so it changes whenever one of them does.
+    """
+    root = html.fromstring(page_source, base_url=base_url)
+    root.make_links_absolute()
+    cards = {}
+    for a in root.xpath(f"//a[{_has_class('signal-card__wrapper')}][@href]"):
+        cards.setdefault(a.get("href"), hashlib.sha1(_text(a).encode()).hexdigest())
+    return cards
+
+def parse_page_count(page_source: str) -> int:
+    """Number of pages of a signal list, read from its pagination links"""
+    root = html.fromstring(page_source)
+    pages = [int(match.group(1)) for href in root.xpath("//a/@href") if (match := PAGE_RE.search(href))]
+    return max(pages, default=1)
@@ -0,0 +1,147 @@
+import multiprocessing as mp
+import queue
+from pathlib import Path
+from typing import Callable, Iterator, Sequence
+
+from tqdm import tqdm
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+
+from .fetcher import create_driver
+from .model import Signal
+from .scheduler import CrawlScheduler
+from .scraper import SignalScrapper
+from .state import CrawlState
+from .storage import JsonlWriter, Sink, signal_record, write_to_sinks
+from .telemetry import Telemetry
+
+
+def _healthy(driver: WebDriver) -> bool:
+    try:
+        driver.execute_script("return 1")
+        return True
+    except WebDriverException:
+        return False
+
+def _quit(driver: WebDriver | None):
+    if driver is None:
+        return
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass
+
+def _worker(tasks: mp.Queue, results: mp.Queue, page_source: bool, recycle_after: int, rate: float):
+    scheduler = CrawlScheduler(concurrency=1, rate=rate)
+    driver = None
+    pages = 0
+    while (url := tasks.get()) is not None:
+        # Restart Chrome when it died or has served enough pages to have grown large.
+        if driver is None or pages >= recycle_after or not _healthy(driver):
+            _quit(driver)
+            driver = create_driver(headless=True)
+            pages = 0
+        # A fresh telemetry per page, sent back with the result to be merged.
+        telemetry = Telemetry()
+        ss = SignalScrapper(driver, page_source=page_source, scheduler=scheduler, telemetry=telemetry)
+        try:
+            results.put((url, scheduler.call(url, ss.scrape_url), None, telemetry))
+        except Exception as e:
+            telemetry.failure(e)
+            results.put((url, None, repr(e), telemetry))
+        pages += 1
+    _quit(driver)
+
+
+class SignalScrapperPool:
+    """Scrapes signals with one headless Chrome per worker process
+
+    Workers pull urls from a shared queue and send the parsed signals back, so
+    the output file is still written by this process only. Each worker gets
+    an equal slice of the per-host rate.
+    """
+
+    def __init__(
+        self,
+        workers: int = 4,
+        page_source: bool = True,
+        recycle_after: int = 50,
+        rate: float = 0.5,
+        telemetry: Telemetry | None = None,
+    ):
+        self.workers = workers
+        self.page_source = page_source
+        self.recycle_after = recycle_after
+        self.rate = rate
+        self.telemetry = telemetry or Telemetry()
+
+    def scrape(
+        self,
+        urls: list[str],
+        output_path: Path | None = None,
+        state: CrawlState | None = None,
+        on_signal: Callable[[str, dict], None] | None = None,
+    ) -> list[Signal]:
+        return list(self.iter_scrape(urls, output_path=output_path, state=state, on_signal=on_signal))
+
+    def iter_scrape(
+        self,
+        urls: list[str],
+        output_path: Path | None = None,
+        state: CrawlState | None = None,
+        on_signal: Callable[[str, dict], None] | None = None,
+        sinks: Sequence[Sink] = (),
+    ) -> Iterator[Signal]:
+        """Yields signals as the workers send them back, see SignalScrapper.iter_scrape"""
+        ctx = mp.get_context("spawn")
+        tasks = ctx.Queue()
+        results = ctx.Queue()
+        for url in urls:
+            tasks.put(url)
+        for _ in range(self.workers):
+            tasks.put(None)
+        args = (tasks, results, self.page_source, self.recycle_after, self.rate / self.workers)
+        processes = [ctx.Process(target=_worker, args=args, daemon=True) for _ in range(self.workers)]
+        for process in processes:
+            process.start()
+
+        sinks = [*([JsonlWriter(output_path)] if output_path else []), *sinks]
+        progress = tqdm(total=len(urls))
+        received = 0
+        try:
+            while received < len(urls):
+                try:
+                    url, signal, error, telemetry = results.get(timeout=10)
+                except queue.Empty:
+                    if not any(process.is_alive() for process in processes):
+                        break
+                    continue
+                received += 1
+                progress.update()
+                self.telemetry.merge(telemetry)
+                if error is not None:
+                    self.telemetry.count("pages", outcome="failed")
+                    if state is not None:
+                        state.mark_failed(url, error)
+                    continue
+                self.telemetry.count("pages", outcome="ok")
+
+                record = signal_record(url, signal)
+
+                def _done(url=url, record=record):
+                    if state is not None:
+                        state.mark_done(url)
+                    if on_signal is not None:
+                        on_signal(url, record)
+
+                with self.telemetry.timer("write"):
+                    write_to_sinks(sinks, record, _done)
+                yield signal
+        finally:
+            for sink in sinks:
+                sink.close()
+            progress.close()
+            for process in processes:
+                if received < len(urls):
+                    process.terminate()
+                process.join()
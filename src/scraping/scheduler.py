@@ -0,0 +1,192 @@
+import asyncio
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterator
+from urllib.parse import urlsplit
+
+from .fetcher import FetchError
+from .telemetry import Telemetry, classify
+
+
+# Responses meaning the host wants us to slow down (WAF block, rate limit, overload).
+THROTTLE_STATUSES = {403, 429, 500, 502, 503, 504}
+
+
+def is_throttled(error: BaseException) -> bool:
+    return isinstance(error, FetchError) and error.status in THROTTLE_STATUSES
+
+
+class TokenBucket:
+    """Token bucket with an adaptive rate
+
+    The rate is halved on every throttled response and recovers additively on
+    success (AIMD), so the crawl settles just under what the host tolerates.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.01):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    async def acquire(self):
+        # Check-and-take never awaits in between, so no lock is needed on one loop.
+        while True:
+            now = time.monotonic()
+            wait = self.paused_until - now
+            if wait <= 0:
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            await asyncio.sleep(wait)
+
+    def success(self):
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 10)
+
+    def throttled(self, backoff: float):
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        self.paused_until = max(self.paused_until, time.monotonic() + backoff)
+
+
+class HostRateLimiter:
+    """One token bucket per host"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.buckets: dict[str, TokenBucket] = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(self.rate, self.burst)
+        return self.buckets[host]
+
+
+class CrawlScheduler:
+    """Runs blocking page jobs concurrently under a per-host politeness limit
+
+    Jobs run in worker threads, at most `concurrency` at a time, and each one
+    waits for a token of its host first. Throttled jobs (see THROTTLE_STATUSES)
+    back off exponentially and are retried up to `max_retries` times.
+
+    With a telemetry, the time jobs spend waiting for a token is observed as
+    the "rate_limit" stage and every retry is counted by the kind of failure.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 4,
+        rate: float = 0.5,
+        burst: int = 1,
+        max_retries: int = 3,
+        backoff: float = 30,
+        telemetry: Telemetry | None = None,
+    ):
+        self.concurrency = concurrency
+        self.limiter = HostRateLimiter(rate, burst)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.telemetry = telemetry
+
+    async def _call(self, url: str, work: Callable[[str], Any]) -> Any:
+        bucket = self.limiter.bucket(url)
+        for retry in range(self.max_retries + 1):
+            started = time.perf_counter()
+            await bucket.acquire()
+            if self.telemetry is not None:
+                self.telemetry.observe("rate_limit", time.perf_counter() - started)
+            try:
+                result = await asyncio.to_thread(work, url)
+            except Exception as e:
+                if not is_throttled(e) or retry == self.max_retries:
+                    raise
+                if self.telemetry is not None:
+                    self.telemetry.count("retries", kind=classify(e)[0])
+                bucket.throttled(self.backoff * 2 ** retry)
+                continue
+            bucket.success()
+            return result
+
+    async def crawl(
+        self,
+        urls: list[str],
+        work: Callable[[str], Any],
+        on_result: Callable[[str, Any, Exception | None], None],
+        stop: threading.Event | None = None,
+    ):
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def _run(url: str):
+            async with semaphore:
+                if stop is not None and stop.is_set():
+                    return
+                try:
+                    result = await self._call(url, work)
+                except Exception as e:
+                    on_result(url, None, e)
+                else:
+                    on_result(url, result, None)
+
+        await asyncio.gather(*(_run(url) for url in urls))
+
+    def run(
+        self,
+        urls: list[str],
+        work: Callable[[str], Any],
+        on_result: Callable[[str, Any, Exception | None], None],
+        stop: threading.Event | None = None,
+    ):
+        asyncio.run(self.crawl(urls, work, on_result, stop))
+
+    def iter_results(self, urls: list[str], work: Callable[[str], Any]) -> Iterator[tuple[str, Any, Exception | None]]:
+        """Yields (url, result, error) as jobs finish
+
+        The crawl runs in a background thread and hands results over through a
+        small bounded queue, so a slow consumer holds back new jobs instead of
+        letting results pile up. Closing the iterator cancels the jobs not
+        started yet.
+        """
+        results: queue.Queue = queue.Queue(maxsize=self.concurrency * 2)
+        stop = threading.Event()
+        finished = object()
+        failure: list[BaseException] = []
+
+        def _put(*result):
+            while not stop.is_set():
+                try:
+                    results.put(result, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def _run():
+            try:
+                self.run(urls, work, _put, stop)
+            except BaseException as e:
+                failure.append(e)
+            finally:
+                _put(finished)
+
+        thread = threading.Thread(target=_run, daemon=True)
+        thread.start()
+        try:
+            while (result := results.get())[0] is not finished:
+                yield result
+        finally:
+            stop.set()
+            thread.join()
+        if failure:
+            raise failure[0]
+
+    def call(self, url: str, work: Callable[[str], Any]) -> Any:
+        """Runs a single job under the rate limit"""
+        return asyncio.run(self._call(url, work))
@@ -1,130 +1,223 @@
-import re
-import time
+import json
+import threading
 from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterator, Sequence
 
+from lxml import html
 from tqdm import tqdm
-import pandas as pd
-from selenium.webdriver.common.by import By
-from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException
-from selenium.webdriver.remote.webdriver import WebDriver
-from selenium.webdriver.remote.webelement import WebElement
 
+from .fetcher import Fetcher
 from .model import (
     Signal,
     SignalTop,
     SignalAccount,
     SignalStats,
 )
-from .utils import extract_float, parse_value, waf_element, waf_elements
+from .parser import (
+    PAIR_XPATH,
+    SIGNAL_DATA_SCRIPT,
+    TOP_XPATHS,
+    account_from_growth,
+    format_currency,
+    format_rating,
+    format_rating_num,
+    format_reliability,
+    format_subscriber_funds,
+    format_week,
+    parse_account,
+    parse_stats,
+    parse_top,
+    stats_from_labels,
+)
+from .scheduler import CrawlScheduler
+from .state import CrawlState
+from .storage import JsonlWriter, Sink, signal_record, write_to_sinks
+from .telemetry import Telemetry
+from .utils import WaitPolicy
+
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+    from selenium.webdriver.remote.webelement import WebElement
 
 
 class SignalScrapper:
 
-    def __init__(self, driver: WebDriver):
+    def __init__(
+        self,
+        driver: "WebDriver | None" = None,
+        page_source: bool = False,
+        fetcher: Fetcher | None = None,
+        fallback: Fetcher | None = None,
+        scheduler: CrawlScheduler | None = None,
+        wait: WaitPolicy | None = None,
+        telemetry: Telemetry | None = None,
+    ):
         self.driver = driver
-
-    def scrape(self, urls: list[str], close: bool = True, output_path: Path | None = None) -> list[Signal]:
-        signals = []
-        for url in tqdm(urls):
-            try:
-                self._get(url)
-                signal = self._scrape()
-                signals.append(signal)
-                if output_path:
-                    with open(output_path, "a") as f:
-                        record = str(signal.record())
-                        record = record.replace("\n", "")
-                        f.write(f"{record}\n")
-            except Exception:
-                pass
-            finally:
-                time.sleep(10)
-        if close:
-            self._close()
-        return signals
+        # Where the time goes: fetch, wait, parse per section and write.
+        self.telemetry = telemetry or Telemetry()
+        # How long WebDriver lookups wait for their element.
+        self.wait = wait or WaitPolicy(telemetry=self.telemetry)
+        # Parse the whole page from a single page_source snapshot instead of
+        # querying the WebDriver once per field.
+        self.page_source = page_source
+        # With a fetcher, pages are loaded without the driver and parsed from html.
+        # The fallback fetcher is used for pages the fetched html can't be parsed from.
+        self.fetcher = fetcher
+        self.fallback = fallback
+        self.fallback_lock = threading.Lock()
+        # A single driver can only load one page at a time.
+        self.scheduler = scheduler or CrawlScheduler(concurrency=1 if fetcher is None else 4, telemetry=self.telemetry)
+        if fetcher is None and self.scheduler.concurrency != 1:
+            raise ValueError("The WebDriver path can't scrape concurrently, use a fetcher.")
+
+    def scrape(
+        self,
+        urls: list[str],
+        close: bool = True,
+        output_path: Path | None = None,
+        state: CrawlState | None = None,
+        on_signal: Callable[[str, dict], None] | None = None,
+    ) -> list[Signal]:
+        return list(self.iter_scrape(urls, close=close, output_path=output_path, state=state, on_signal=on_signal))
+
+    def iter_scrape(
+        self,
+        urls: list[str],
+        close: bool = True,
+        output_path: Path | None = None,
+        state: CrawlState | None = None,
+        on_signal: Callable[[str, dict], None] | None = None,
+        sinks: Sequence[Sink] = (),
+        on_error: Callable[[str, Exception], None] | None = None,
+    ) -> Iterator[Signal]:
+        """Yields signals as they are scraped
+
+        Each signal is also written to the sinks (and to a JSON Lines journal at
+        output_path) as its signal_record(); state and on_signal get the url and
+        record once every sink has it on disk. Failed urls are reported to state
+        and on_error. The sinks are closed when the iteration ends.
+        """
+        sinks = [*([JsonlWriter(output_path)] if output_path else []), *sinks]
+        progress = tqdm(total=len(urls))
+        try:
+            for url, signal, error in self.scheduler.iter_results(urls, self.scrape_url):
+                progress.update()
+                if error is not None:
+                    self.telemetry.failure(error)
+                    self.telemetry.count("pages", outcome="failed")
+                    if state is not None:
+                        state.mark_failed(url, repr(error))
+                    if on_error is not None:
+                        on_error(url, error)
+                    continue
+                self.telemetry.count("pages", outcome="ok")
+
+                record = signal_record(url, signal)
+
+                def _done(url=url, record=record):
+                    if state is not None:
+                        state.mark_done(url)
+                    if on_signal is not None:
+                        on_signal(url, record)
+
+                with self.telemetry.timer("write"):
+                    write_to_sinks(sinks, record, _done)
+                yield signal
+        finally:
+            for sink in sinks:
+                sink.close()
+            progress.close()
+            if close:
+                self._close()
+
+    def scrape_url(self, url: str) -> Signal:
+        if self.fetcher is not None:
+            return self._scrape_fetched(url)
+        self._get(url)
+        return self._scrape()
 
     def _scrape(self) -> Signal:
-        top = self._scrape_top()
-        account = self._scrape_account()
-        stats = self._scrape_stats()
+        if self.page_source:
+            return self._scrape_page_source()
+        with self.telemetry.timer("parse", section="top"):
+            top = self._scrape_top()
+        account, stats = self._scrape_account_and_stats()
+        return Signal(top=top, account=account, stats=stats)
+
+    def _scrape_page_source(self) -> Signal:
+        self._activate_stats_tab()
+        self.wait.element(self.driver, PAIR_XPATH, field="pair")
+        with self.telemetry.timer("fetch", source="page_source"):
+            page = self.driver.page_source
+        return self._parse(page)
+
+    def _scrape_fetched(self, url: str) -> Signal:
+        with self.telemetry.timer("fetch"):
+            page = self.fetcher.get(url)
+        try:
+            return self._parse(page)
+        except (ValueError, IndexError) as e:
+            if self.fallback is None:
+                raise
+            self.telemetry.count("fallbacks", field=getattr(e, "field", ""))
+            with self.fallback_lock:
+                with self.telemetry.timer("fetch", source="fallback"):
+                    page = self.fallback.get(url)
+                return self._parse(page)
+
+    def _parse(self, page: str) -> Signal:
+        """Same as parse_signal, with each section timed"""
+        with self.telemetry.timer("parse", section="html"):
+            root = html.fromstring(page)
+        with self.telemetry.timer("parse", section="top"):
+            top = parse_top(root)
+        with self.telemetry.timer("parse", section="account"):
+            account = parse_account(root)
+        with self.telemetry.timer("parse", section="stats"):
+            stats = parse_stats(root)
         return Signal(top=top, account=account, stats=stats)
 
+    def _activate_stats_tab(self):
+        stats_tab = self.wait.element(self.driver, "//li[@id='tab_stats']", field="tab_stats")
+        self.driver.execute_script("arguments[0].click();", stats_tab)
+
     def _get(self, url: str):
-        self.driver.get(url)
+        with self.telemetry.timer("fetch"):
+            self.driver.get(url)
+        self.wait.ready(self.driver)
 
     def _close(self):
-        self.driver.close()
+        if self.fetcher is not None:
+            self.fetcher.close()
+        if self.fallback is not None:
+            self.fallback.close()
+        if self.driver is not None:
+            self.driver.quit()
 
     def _scrape_top(self) -> SignalTop:
 
-        xpaths = {
-            "name": "//div[@class='s-line-card__title']",
-            "author": "//div[@class='s-line-card__author']",
-            "rating": "//div[@class='s-line-card__rating rating-area']/div",
-            "rating_num": "//div[@class='s-line-card__rating rating-area']",
-            "reliability": "//div[@class='s-indicators__item s-indicators__item_risk']/div",
-            "week": "//span[@class='s-indicators__item-desc s-indicators__item-desc_weeks']",
-            "subscriber_num": "//div[@class='s-indicators__item-wrapper  s-indicators__item-wrapper_subscribers']/span[2]",
-            "subscriber_funds": "//div[@class='s-indicators__item-wrapper  s-indicators__item-wrapper_subscribers']/span[3]",
-            "currency": "//div[@class='chart-bar_horiz__value']",
-        }
-
-        def _format_rating(rating_str: str) -> float:
-            rating = re.search(r"(\d+)", rating_str)
-            if not rating:
-                return 0.0
-            return int(rating.group(1)) / 10
-
-        def _format_rating_num(rating_num_str: str) -> int:
-            rating_num = re.search(r"(\d+)", rating_num_str)
-            if not rating_num:
-                raise ValueError("Rating num not found")
-            return int(rating_num.group(1))
-
-        def _format_reliability(reliability_str: str) -> int:
-            reliability = re.search(r"rel(\d)", reliability_str)
-            if not reliability:
-                raise ValueError("Reliability not found")
-            return int(reliability.group(1))
-
-        def _format_week(week_str: str) -> int:
-            week = re.search(r"(\d+)", week_str)
-            if not week:
-                raise ValueError("Week not found")
-            return int(week.group(1))
-
-        def _format_subscriber_funds(subscriber_funds_str: str) -> int:
-            subscriber_funds = re.search(r"(\d+[KM]*)", subscriber_funds_str)
-            if not subscriber_funds:
-                raise ValueError("Subscriber funds not found")
-            if "K" in subscriber_funds.group(1):
-                return int(float(subscriber_funds.group(1).replace("K", "")) * 1000)
-            elif "M" in subscriber_funds.group(1):
-                return int(float(subscriber_funds.group(1).replace("M", "")) * 1000000)
-            else:
-                return int(subscriber_funds.group(1))
-
-        def _format_currency(currency_str: str) -> str:
-            currency = re.search(r"(\w+)", currency_str)
-            if not currency:
-                raise ValueError("Currency not found")
-            return currency.group(1)
-
-        name = waf_element(self.driver, xpaths["name"]).text
-        author = waf_element(self.driver, xpaths["author"]).text
-        rating = _format_rating(waf_element(self.driver, xpaths["rating"]).get_attribute("class") or "")
-        rating_num = _format_rating_num(waf_element(self.driver, xpaths["rating_num"]).text)
+        from selenium.common.exceptions import WebDriverException
+
+        def _element(field: str, required: bool = True) -> "WebElement | None":
+            return self.wait.element(self.driver, TOP_XPATHS[field], field=field, required=required)
+
+        name = _element("name").text
+        author = _element("author").text
+        rating = format_rating(_element("rating").get_attribute("class") or "")
+        rating_num = format_rating_num(_element("rating_num").text)
         # The reliability factor may not be present. In that case, treat it as -1.
         try:
-            reliability_ele = self.driver.find_element(By.XPATH, xpaths["reliability"]).get_attribute("class")
-            reliability_ele = reliability_ele or ""
-            reliability = _format_reliability(reliability_ele)
+            reliability_ele = _element("reliability", required=False)
+            if reliability_ele is None:
+                reliability = -1
+            else:
+                reliability = format_reliability(reliability_ele.get_attribute("class") or "")
         except WebDriverException:
             reliability = -1
-        week = _format_week(waf_element(self.driver, xpaths["week"]).text)
-        subscriber_num = int(waf_element(self.driver, xpaths["subscriber_num"]).text)
-        subscriber_funds = _format_subscriber_funds(waf_element(self.driver, xpaths["subscriber_funds"]).text)
-        currency = _format_currency(waf_element(self.driver, xpaths["currency"]).text)
+        week = format_week(_element("week").text)
+        subscriber_num = int(_element("subscriber_num").text)
+        subscriber_funds = format_subscriber_funds(_element("subscriber_funds").text)
+        currency = format_currency(_element("currency").text)
 
         return SignalTop(
             name=name,
@@ -138,100 +231,18 @@ class SignalScrapper:
             currency=currency,
         )
 
-    def _scrape_account(self) -> SignalAccount:
-
-        def _get_growth_info(growth_chart: WebElement):
-            header_divs = waf_elements(growth_chart, ".svg-chart__indicator-value", by=By.CSS_SELECTOR)
-            header_divs = [waf_elements(div, "div", By.CSS_SELECTOR) for div in header_divs]
-            growth_total = extract_float(header_divs[0][0].text)
-            growth_ave = extract_float(header_divs[1][0].text)
-            deposit = extract_float(header_divs[2][0].text) if len(header_divs) >= 3 else 0
-            withdrawal = extract_float(header_divs[3][0].text) if len(header_divs) >= 4 else 0
-            return growth_total, growth_ave, deposit, withdrawal
-
-        def _get_growth_table(growth_chart: WebElement):
-            table = waf_element(growth_chart, "table", by=By.CSS_SELECTOR)
-            table_header_rows = waf_elements(table, "thead > tr", by=By.CSS_SELECTOR)
-            table_body_rows = waf_elements(table, "tbody > tr", by=By.CSS_SELECTOR)
-            header: list[str] = []
-            for row in table_header_rows:
-                th = waf_elements(row, "th", by=By.CSS_SELECTOR)
-                header = [t.text for t in th]
-            body: list[list[float]] = []
-            for row in table_body_rows:
-                td = waf_elements(row, "td", by=By.CSS_SELECTOR)
-                body.append([float(t.text.replace("%", "") or 0) for t in td])
-            table_df = pd.DataFrame(body)
-            table_df.columns = header
-            table_df.drop(columns=["Year"], inplace=True)
-            table_df.rename(columns={"": "year"}, inplace=True)
-            table_df.set_index("year", inplace=True)
-            table_df.index = table_df.index.astype(int)
-            return table_df
-
-        growth_chart = waf_element(self.driver, "growth_chart", by=By.ID)
-        growth_total, growth_ave, deposit, withdrawal = _get_growth_info(growth_chart)
-        growth_table_df = _get_growth_table(growth_chart)
-
-        return SignalAccount(
-            growth_total=growth_total,
-            growth_ave=growth_ave,
-            deposit=deposit,
-            withdrawal=withdrawal,
-            growth_table=growth_table_df,
-        )
-
-    def _scrape_stats(self) -> SignalStats:
-
-        stats_tab = waf_element(self.driver, "//li[@id='tab_stats']")
-        self.driver.execute_script("arguments[0].click();", stats_tab)
-
-        items = {
-            "Trades:": "trades",
-            "Profit Trades:": "profit_trades",
-            "Loss Trades:": "loss_trades",
-            "Best trade:": "best_trade",
-            "Worst trade: ": "worst_trade",
-            "Gross Profit:": "gross_profit",
-            "Gross Loss:": "gross_loss",
-            "Maximum consecutive wins:": "max_consecutive_wins",
-            "Maximal consecutive profit:": "max_consecutive_profit",
-            "Sharpe Ratio:": "sharpe_ratio",
-            "Trading activity:": "trading_activity",
-            "Max deposit load:": "max_deposit_load",
-            "Latest trade:": "latest_trade",
-            "Trades per week:": "trades_per_week",
-            "Avg holding time:": "avg_holding_time",
-            "Recovery Factor:": "recovery_factor",
-            "Long Trades:": "long_trades",
-            "Short Trades:": "short_trades",
-            "Profit Factor:": "profit_factor",
-            "Expected Payoff:": "expected_payoff",
-            "Average Profit:": "average_profit",
-            "Average Loss:": "average_loss",
-            "Maximum consecutive losses:": "max_consecutive_losses",
-            "Maximal consecutive loss:": "max_consecutive_loss",
-            "Monthly growth:": "monthly_growth",
-            "Annual Forecast:": "annual_forecast",
-            "Algo trading:": "algo_trading",
-            "Absolute": "drawdown_abs",
-            "Maximal": "drawdown_max",
-            "By Balance": "drawdown_rel_bal",
-            "By Equity": "drawdown_rel_equ",
-        }
-
-        stats = {}
-
-        for label, key in items.items():
-            try:
-                item_label_xpath = f"//div[contains(@class, 's-data-columns__label') and contains(text(), '{label}')]"
-                item_value_xpath = f"./following-sibling::div[contains(@class, 's-data-columns__value')]"
-                item_label = waf_element(self.driver, item_label_xpath)
-                item_value = waf_element(item_label, item_value_xpath).text.strip()
-                stats[key] = parse_value(item_value)
-            except (NoSuchElementException, TimeoutException):
-                stats[key] = None
-
-        stats["pair"] = waf_element(self.driver, "//td[@class='col-symbol']").text
-
-        return SignalStats(**stats)
+    def _scrape_account_and_stats(self) -> tuple[SignalAccount, SignalStats]:
+        """Reads the growth chart and the stats tab with a single script call
+
+        Labels are mapped in Python, so a field missing from the page costs
+        nothing instead of a wait timeout.
+        """
+        self._activate_stats_tab()
+        self.wait.element(self.driver, PAIR_XPATH, field="pair")
+        with self.telemetry.timer("parse", section="script"):
+            data = json.loads(self.driver.execute_script(SIGNAL_DATA_SCRIPT))
+        with self.telemetry.timer("parse", section="account"):
+            account = account_from_growth(data["indicators"], data["header"], data["rows"])
+        with self.telemetry.timer("parse", section="stats"):
+            stats = stats_from_labels(data["labels"], data["pair"])
+        return account, stats
@@ -0,0 +1,73 @@
+import sqlite3
+import time
+from pathlib import Path
+
+
+PENDING = "pending"
+DONE = "done"
+FAILED = "failed"
+
+
+class CrawlState:
+    """Per-url status of a crawl, persisted in sqlite
+
+    Holds the discovered link list in discovery order together with the status
+    of every url, so an interrupted crawl can skip what is done and retry what
+    failed.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                position INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                reason TEXT,
+                retries INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL
+            )
+            """
+        )
+        self.conn.commit()
+
+    def add_links(self, urls: list[str]):
+        start = self.conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM urls").fetchone()[0]
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO urls (url, position) VALUES (?, ?)",
+            [(url, start + i) for i, url in enumerate(urls)],
+        )
+        self.conn.commit()
+
+    def links(self) -> list[str]:
+        return [url for url, in self.conn.execute("SELECT url FROM urls ORDER BY position")]
+
+    def pending(self, max_retries: int = 3) -> list[str]:
+        """Urls not done yet, skipping the ones that failed max_retries times"""
+        rows = self.conn.execute(
+            "SELECT url FROM urls WHERE status = ? OR (status = ? AND retries < ?) ORDER BY position",
+            (PENDING, FAILED, max_retries),
+        )
+        return [url for url, in rows]
+
+    def mark_done(self, url: str):
+        self.conn.execute(
+            "UPDATE urls SET status = ?, reason = NULL, updated_at = ? WHERE url = ?",
+            (DONE, time.time(), url),
+        )
+        self.conn.commit()
+
+    def mark_failed(self, url: str, reason: str):
+        self.conn.execute(
+            "UPDATE urls SET status = ?, reason = ?, retries = retries + 1, updated_at = ? WHERE url = ?",
+            (FAILED, reason, time.time(), url),
+        )
+        self.conn.commit()
+
+    def summary(self) -> dict[str, int]:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM urls GROUP BY status"))
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,317 @@
+import ast
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from functools import cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Iterator
+
+from .model import Signal
+from .model.account import MONTHS
+from .parser import STATS_ITEMS
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+    from .model import SignalFrame
+
+
+@cache
+def _schemas() -> tuple["pa.DataType", "pa.Schema"]:
+    import pyarrow as pa
+
+    growth_row = pa.struct([("year", pa.int64()), ("months", pa.list_(pa.float64()))])
+    schema = pa.schema(
+        [
+            ("url", pa.string()),
+            ("name", pa.string()),
+            ("author", pa.string()),
+            ("rating", pa.float64()),
+            ("rating_num", pa.int64()),
+            ("reliability", pa.int64()),
+            ("week", pa.int64()),
+            ("subscriber_num", pa.int64()),
+            ("subscriber_funds", pa.int64()),
+            ("currency", pa.string()),
+            ("growth_total", pa.float64()),
+            ("growth_ave", pa.float64()),
+            ("deposit", pa.float64()),
+            ("withdrawal", pa.float64()),
+            ("growth_table", pa.list_(growth_row)),
+            *[(key, pa.float64()) for key in STATS_ITEMS.values()],
+            ("pair", pa.string()),
+            ("fetched_at", pa.float64()),
+            ("verified_at", pa.float64()),
+        ]
+    )
+    return growth_row, schema
+
+def __getattr__(name: str):
+    # GROWTH_ROW and SCHEMA are built on first access.
+    if name == "GROWTH_ROW":
+        return _schemas()[0]
+    if name == "SCHEMA":
+        return _schemas()[1]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Journal lines start with the url, see format_record. Older journals have none.
+URL_PREFIX = '{"url": '
+_decoder = json.JSONDecoder()
+
+
+def to_row(record: dict) -> dict:
+    """Converts a Signal record to its stored form
+
+    The growth table becomes a list of {"year", "months"} rows instead of a
+    dict keyed by month, so that it survives JSON (no int keys) and maps to a
+    nested list column in Arrow.
+    """
+    growth_table = record["growth_table"]
+    years = sorted({year for column in growth_table.values() for year in column})
+    rows = [{"year": int(year), "months": [growth_table.get(month, {}).get(year) for month in MONTHS]} for year in years]
+    return {**record, "growth_table": rows}
+
+def from_row(row: dict) -> dict:
+    """Inverse of to_row, gives back the record as Signal.record() returned it"""
+    growth_table: dict[str, dict[int, float]] = {month: {} for month in MONTHS}
+    for growth_row in row["growth_table"]:
+        for month, value in zip(MONTHS, growth_row["months"]):
+            growth_table[month][int(growth_row["year"])] = value
+    return {**row, "growth_table": growth_table}
+
+def signal_record(url: str, signal: Signal, fetched_at: float | None = None) -> dict:
+    """Signal.record() of a signal with the url it was scraped from
+
+    fetched_at (epoch seconds, now by default) is when its page was fetched,
+    the time relative fields such as latest_trade count from. verified_at is
+    when the record was last known to be current: its fetch time, or the
+    crawl time for one carried forward from a snapshot.
+    """
+    fetched_at = time.time() if fetched_at is None else fetched_at
+    return {"url": url, **signal.record(), "fetched_at": fetched_at, "verified_at": fetched_at}
+
+def format_record(record: dict) -> str:
+    """Journal line of a signal_record(), its url first"""
+    return json.dumps({"url": record["url"], **to_row(record)})
+
+def parse_record(line: str) -> dict:
+    # Journals written before the JSON Lines format hold one Python repr per line.
+    if line.startswith("{'"):
+        return ast.literal_eval(line)
+    return from_row(json.loads(line))
+
+def record_url(line: str) -> str | None:
+    """Url of a journal line, read from its start without parsing the rest"""
+    if not line.startswith(URL_PREFIX):
+        return None
+    url, _ = _decoder.raw_decode(line, len(URL_PREFIX))
+    return url
+
+def iter_records(path: Path) -> Iterator[dict]:
+    """Records of a journal, in journal order
+
+    A signal written more than once (a crawl resumed after its line reached
+    the disk but before it was checkpointed) gives only its last record.
+    """
+    last = {}
+    with open(path) as f:
+        for number, line in enumerate(f):
+            url = record_url(line)
+            if url is not None:
+                last[url] = number
+    with open(path) as f:
+        for number, line in enumerate(f):
+            if not line.strip():
+                continue
+            url = record_url(line)
+            if url is None or last[url] == number:
+                yield parse_record(line)
+
+def read_records(path: Path) -> list[dict]:
+    return list(iter_records(path))
+
+
+class Sink(ABC):
+    """Destination of scraped signals, written as they arrive and flushed in batches"""
+
+    @abstractmethod
+    def write(self, record: dict, on_durable: Callable[[], None] | None = None):
+        """Writes a signal_record(); on_durable runs once it is safely on disk"""
+
+    @abstractmethod
+    def close(self):
+        ...
+
+
+def write_to_sinks(sinks: list[Sink], record: dict, on_durable: Callable[[], None]):
+    """Writes a record to every sink, on_durable runs once all of them have it on disk"""
+    if not sinks:
+        on_durable()
+        return
+    remaining = len(sinks)
+
+    def _durable():
+        nonlocal remaining
+        remaining -= 1
+        if remaining == 0:
+            on_durable()
+
+    for sink in sinks:
+        sink.write(record, _durable)
+
+
+def truncate_torn_line(path: Path, block_size: int = 1 << 16):
+    """Cuts a journal back to its last complete line"""
+    if not path.exists():
+        return
+    with open(path, "r+b") as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - block_size)
+            f.seek(start)
+            block = f.read(position - start)
+            newline = block.rfind(b"\n")
+            if newline != -1:
+                position = start + newline + 1
+                break
+            position = start
+        if position != end:
+            f.truncate(position)
+
+
+class JsonlWriter(Sink):
+    """Buffered JSON Lines writer with periodic fsync
+
+    Callbacks given to write() run once the line is fsynced, so a checkpoint
+    that marks a signal done never gets ahead of the data on disk. The buffer
+    can reach the disk before that, so a line may be there without its
+    checkpoint (iter_records keeps the last line of a url) or cut short by a
+    crash (dropped when the journal is opened again).
+    """
+
+    def __init__(self, path: Path, fsync_every: int = 100, buffer_size: int = 1 << 16):
+        truncate_torn_line(path)
+        self.file = open(path, "a", buffering=buffer_size)
+        self.fsync_every = fsync_every
+        self.unsynced = 0
+        self.callbacks: list[Callable[[], None]] = []
+
+    def write(self, record: dict, on_durable: Callable[[], None] | None = None):
+        self.write_line(format_record(record), on_durable)
+
+    def write_line(self, line: str, on_durable: Callable[[], None] | None = None):
+        self.file.write(f"{line}\n")
+        if on_durable is not None:
+            self.callbacks.append(on_durable)
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def close(self):
+        self.sync()
+        self.file.close()
+
+
+class ParquetWriter(Sink):
+    """Writes records to a new parquet file in a directory, one row group per batch"""
+
+    def __init__(self, directory: Path, batch_size: int = 1000):
+        import pyarrow.parquet as pq
+
+        directory.mkdir(parents=True, exist_ok=True)
+        part = len(list(directory.glob("part-*.parquet")))
+        self.schema = _schemas()[1]
+        self.writer = pq.ParquetWriter(directory / f"part-{part:05d}.parquet", self.schema)
+        self.batch_size = batch_size
+        self.rows: list[dict] = []
+        self.callbacks: list[Callable[[], None]] = []
+
+    def write(self, record: dict, on_durable: Callable[[], None] | None = None):
+        self.rows.append(to_row(record))
+        if on_durable is not None:
+            self.callbacks.append(on_durable)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.rows:
+            import pyarrow as pa
+
+            self.writer.write_table(pa.Table.from_pylist(self.rows, schema=self.schema))
+            self.rows = []
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def close(self):
+        self.flush()
+        self.writer.close()
+
+
+def load_frame(path: Path) -> "pd.DataFrame":
+    """Loads stored records into a DataFrame without evaluating rows one by one
+
+    Accepts a JSON Lines journal or a parquet file / partitioned directory
+    (e.g. one `snapshot_date=YYYY-MM-DD` directory per crawl). growth_table
+    stays a nested column of {"year", "months"} rows.
+    """
+    import pandas as pd
+
+    if path.is_dir() or path.suffix == ".parquet":
+        return pd.read_parquet(path)
+    with open(path) as f:
+        legacy = f.read(2) == "{'"
+    if legacy:
+        return pd.DataFrame.from_records([to_row(record) for record in iter_records(path)])
+    frame = pd.read_json(path, lines=True)
+    if "url" not in frame:
+        return frame
+    # The last line of a url wins, as in iter_records.
+    return frame[~frame["url"].duplicated(keep="last") | frame["url"].isna()].reset_index(drop=True)
+
+def load_signals(path: Path) -> "SignalFrame":
+    """Loads stored records into a SignalFrame
+
+    JSON Lines and parquet are read by Arrow directly, so growth tables are
+    never rebuilt one signal at a time.
+    """
+    import pyarrow.json
+    import pyarrow.parquet as pq
+
+    from .model.frame import SignalFrame
+
+    if path.is_dir() or path.suffix == ".parquet":
+        return SignalFrame.from_table(pq.read_table(path))
+    with open(path) as f:
+        legacy = f.read(2) == "{'"
+    if legacy:
+        return SignalFrame.from_records(iter_records(path))
+    return SignalFrame.from_table(_last_per_url(pyarrow.json.read_json(path)))
+
+def _last_per_url(table: "pa.Table") -> "pa.Table":
+    """Rows of a journal table without the ones a later line of the same url replaces"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if "url" not in table.column_names:
+        return table
+    positions = pa.array(range(table.num_rows), pa.int64())
+    last = (
+        pa.table({"url": table["url"], "position": positions})
+        .group_by("url")
+        .aggregate([("position", "max")])
+        .column("position_max")
+    )
+    return table.filter(pc.or_(pc.is_in(positions, value_set=last), pc.is_null(table["url"])))
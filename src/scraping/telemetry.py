@@ -0,0 +1,214 @@
+import json
+import math
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from .fetcher import FetchError
+from .parser import ParseError
+
+
+# Upper bounds, in seconds, of the latency histogram buckets.
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, math.inf)
+
+METRIC_PREFIX = "scraping"
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def classify(error: BaseException) -> tuple[str, str]:
+    """Sorts a failure into (kind, field)
+
+    kind is one of not_found, waf_block (403 / 429), http_error, timeout,
+    parse_error or other. field names the page field a parse error is about,
+    it is empty for the other kinds.
+    """
+    if isinstance(error, FetchError):
+        if error.status == 404:
+            return "not_found", ""
+        if error.status in (403, 429):
+            return "waf_block", ""
+        return "http_error", ""
+    if isinstance(error, ParseError):
+        return "parse_error", error.field
+    if isinstance(error, _timeouts()):
+        return "timeout", ""
+    if isinstance(error, (ValueError, IndexError, KeyError)):
+        return "parse_error", ""
+    return "other", ""
+
+
+class Histogram:
+    """Latency histogram keeping a count per bucket of BUCKETS"""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram"):
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile"""
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+class Telemetry:
+    """Stage latencies and failure counts of a crawl
+
+    Stages are timed into histograms labelled by stage (fetch, wait, parse,
+    write) plus optional labels such as the parse section or the waited field.
+    Failures are counted by the kind and field classify() gives them.
+    Everything can be written out as a Prometheus text file (for the node
+    exporter textfile collector) or as a JSON summary.
+
+    It is shared across the scheduler threads, so updates take a lock.
+    Worker processes keep their own and send it back to be merged.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.lock = threading.Lock()
+        self.histograms: dict[Labels, Histogram] = {}
+        self.counters: Counter[tuple[str, Labels]] = Counter()
+
+    def __getstate__(self):
+        return {"started": self.started, "histograms": self.histograms, "counters": self.counters}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, **labels: str):
+        key = _labels(stage=stage, **labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timer(self, stage: str, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started, **labels)
+
+    def count(self, name: str, amount: int = 1, **labels: str):
+        with self.lock:
+            self.counters[name, _labels(**labels)] += amount
+
+    def failure(self, error: BaseException):
+        kind, field = classify(error)
+        self.count("errors", kind=kind, field=field)
+
+    def merge(self, other: "Telemetry"):
+        with self.lock:
+            for key, histogram in other.histograms.items():
+                self.histograms.setdefault(key, Histogram()).merge(histogram)
+            self.counters.update(other.counters)
+
+    def summary(self) -> dict:
+        """Throughput, per-stage latencies and failures, as plain data"""
+        elapsed = time.time() - self.started
+        with self.lock:
+            pages = {dict(labels)["outcome"]: n for (name, labels), n in self.counters.items() if name == "pages"}
+            stages = {
+                _format_labels(labels): {
+                    "count": histogram.count,
+                    "total": histogram.sum,
+                    "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                    **{f"p{round(q * 100)}": _finite(histogram.quantile(q)) for q in (0.5, 0.9, 0.99)},
+                }
+                for labels, histogram in sorted(self.histograms.items())
+            }
+            counters = {
+                f"{name}{{{_format_labels(labels)}}}": n for (name, labels), n in sorted(self.counters.items())
+            }
+        return {
+            "elapsed": elapsed,
+            "pages": pages,
+            "pages_per_second": sum(pages.values()) / elapsed if elapsed else 0.0,
+            "stages": stages,
+            "counters": counters,
+        }
+
+    def write_json(self, path: Path):
+        _write_atomic(path, json.dumps(self.summary(), indent=2))
+
+    def write_prometheus(self, path: Path):
+        """Writes the metrics in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {METRIC_PREFIX}_stage_seconds Time spent per crawl stage.",
+            f"# TYPE {METRIC_PREFIX}_stage_seconds histogram",
+        ]
+        with self.lock:
+            for labels, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == math.inf else repr(float(bound))
+                    lines.append(f"{METRIC_PREFIX}_stage_seconds_bucket{{{_format_labels(labels + (('le', le),))}}} {cumulative}")
+                lines.append(f"{METRIC_PREFIX}_stage_seconds_sum{{{_format_labels(labels)}}} {histogram.sum}")
+                lines.append(f"{METRIC_PREFIX}_stage_seconds_count{{{_format_labels(labels)}}} {histogram.count}")
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {METRIC_PREFIX}_{name}_total counter")
+                for (counter, labels), n in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"{METRIC_PREFIX}_{name}_total{{{_format_labels(labels)}}} {n}")
+        lines.append(f"# TYPE {METRIC_PREFIX}_run_seconds gauge")
+        lines.append(f"{METRIC_PREFIX}_run_seconds {time.time() - self.started}")
+        _write_atomic(path, "\n".join(lines) + "\n")
+
+
+def _timeouts() -> tuple[type[BaseException], ...]:
+    # An error can only come from selenium or requests once they are imported,
+    # so classifying doesn't import them.
+    timeouts: list[type[BaseException]] = [TimeoutError]
+    if (selenium := sys.modules.get("selenium.common.exceptions")) is not None:
+        timeouts.append(selenium.TimeoutException)
+    if (requests := sys.modules.get("requests.exceptions")) is not None:
+        timeouts.append(requests.Timeout)
+    return tuple(timeouts)
+
+def _labels(**labels: str) -> Labels:
+    return tuple(sorted(labels.items()))
+
+def _format_labels(labels: Labels) -> str:
+    return ",".join(f'{key}="{_escape(value)}"' for key, value in labels)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _finite(value: float) -> float | None:
+    # Past the last finite bucket, JSON has no way to say how far.
+    return None if math.isinf(value) else value
+
+def _write_atomic(path: Path, text: str):
+    # Scrapers of the file never see it half written.
+    tmp = path.with_name(f"{path.name}.tmp")
+    tmp.write_text(text)
+    os.replace(tmp, path)
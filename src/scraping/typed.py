@@ -0,0 +1,200 @@
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Iterable
+
+import numpy as np
+import pandas as pd
+
+from .model import SignalFrame
+from .model.account import MONTHS
+from .storage import Sink, iter_records
+
+
+# pandas dtype of every scalar field of a signal record. Repeated strings are
+# categoricals, counts are nullable Int32 and most figures float32. Money
+# totals stay float64, float32 would lose their cents. latest_trade, parsed
+# as minutes before the page was fetched, becomes the time of the trade, and
+# the epoch seconds of fetched_at and verified_at become times too.
+DTYPES = {
+    "url": "string",
+    # SignalTop
+    "name": "string",
+    "author": "category",
+    "rating": "float32",
+    "rating_num": "Int32",
+    "reliability": "Int32",
+    "week": "Int32",
+    "subscriber_num": "Int32",
+    "subscriber_funds": "Int32",
+    "currency": "category",
+    # SignalAccount
+    "growth_total": "float32",
+    "growth_ave": "float32",
+    "deposit": "float64",
+    "withdrawal": "float64",
+    # SignalStats
+    "trades": "Int32",
+    "profit_trades": "Int32",
+    "loss_trades": "Int32",
+    "best_trade": "float32",
+    "worst_trade": "float32",
+    "gross_profit": "float64",
+    "gross_loss": "float64",
+    "max_consecutive_wins": "Int32",
+    "max_consecutive_profit": "float32",
+    "sharpe_ratio": "float32",
+    "trading_activity": "float32",
+    "max_deposit_load": "float32",
+    "latest_trade": "datetime64[s, UTC]",
+    "trades_per_week": "float32",
+    "avg_holding_time": "Int32",
+    "recovery_factor": "float32",
+    "long_trades": "Int32",
+    "short_trades": "Int32",
+    "profit_factor": "float32",
+    "expected_payoff": "float32",
+    "average_profit": "float32",
+    "average_loss": "float32",
+    "max_consecutive_losses": "Int32",
+    "max_consecutive_loss": "float32",
+    "monthly_growth": "float32",
+    "annual_forecast": "float32",
+    "algo_trading": "float32",
+    "drawdown_abs": "float32",
+    "drawdown_max": "float32",
+    "drawdown_rel_bal": "float32",
+    "drawdown_rel_equ": "float32",
+    "pair": "category",
+    "fetched_at": "datetime64[s, UTC]",
+    "verified_at": "datetime64[s, UTC]",
+}
+
+EPOCH_COLUMNS = ["fetched_at", "verified_at"]
+TIME_COLUMNS = ["latest_trade", *EPOCH_COLUMNS]
+
+GROWTH_PREFIX = "growth_"
+GROWTH_DTYPE = "float32"
+
+
+def growth_column(year: int, month: int) -> str:
+    return f"{GROWTH_PREFIX}{year}_{month:02d}"
+
+def is_growth_column(name: str) -> bool:
+    # growth_total and growth_ave are scalar fields, not months.
+    return name.startswith(GROWTH_PREFIX) and name not in DTYPES
+
+def to_typed(frame: SignalFrame, scraped_at: datetime | None = None, years: Iterable[int] | None = None) -> pd.DataFrame:
+    """The signals of a SignalFrame as a DataFrame of DTYPES
+
+    The growth tables are flattened into one growth_YYYY_MM column per month
+    of every year in years (all the years of the frame by default), NaN where
+    a signal has no value. Growth of years outside years is left out.
+    latest_trade is counted back from the fetched_at of each signal, or from
+    scraped_at (now by default) for records stored before they had one.
+    """
+    scraped_at = scraped_at or datetime.now(timezone.utc)
+    signals = frame.signals.reindex(columns=list(DTYPES))
+    times = {
+        name: pd.to_datetime(pd.to_numeric(signals[name], errors="coerce"), unit="s", utc=True)
+        for name in EPOCH_COLUMNS
+    }
+    columns = {}
+    for name, dtype in DTYPES.items():
+        if name == "latest_trade":
+            minutes = pd.to_numeric(signals[name], errors="coerce")
+            fetched_at = times["fetched_at"].fillna(pd.Timestamp(scraped_at))
+            columns[name] = (fetched_at - pd.to_timedelta(minutes, unit="min")).astype(dtype)
+        elif name in EPOCH_COLUMNS:
+            columns[name] = times[name].astype(dtype)
+        elif dtype in ("string", "category"):
+            columns[name] = signals[name].astype(dtype)
+        else:
+            columns[name] = pd.to_numeric(signals[name], errors="coerce").astype(dtype)
+
+    years = np.unique(frame.growth_years if years is None else np.fromiter(years, dtype=np.int64))
+    kept = np.isin(frame.growth_years, years)
+    growth = np.full((len(frame), len(years) * len(MONTHS)), np.nan, dtype=GROWTH_DTYPE)
+    positions = np.searchsorted(years, frame.growth_years[kept])[:, None] * len(MONTHS) + np.arange(len(MONTHS))
+    growth[frame.growth_ids[kept][:, None], positions] = frame.growth_values[kept]
+    names = [growth_column(year, month) for year in years for month in range(1, len(MONTHS) + 1)]
+    return pd.concat([pd.DataFrame(columns), pd.DataFrame(growth, columns=names)], axis=1)
+
+def typed_frame(records: Iterable[dict], scraped_at: datetime | None = None) -> pd.DataFrame:
+    """Signal.record() dicts as a DataFrame of DTYPES, see to_typed"""
+    return to_typed(SignalFrame.from_records(records), scraped_at)
+
+def write_csv(path: Path, journal: Path, scraped_at: datetime | None = None, chunk_size: int = 1000):
+    """Writes the records of a journal as a typed csv, chunk_size signals at a time
+
+    A first pass collects the growth years, the second writes the records
+    through a CsvWriter over those years, so memory stays flat however long
+    the journal.
+    """
+    years = sorted({
+        int(year) for record in iter_records(journal) for column in record["growth_table"].values() for year in column
+    })
+    path.unlink(missing_ok=True)
+    writer = CsvWriter(path, years, scraped_at, batch_size=chunk_size)
+    for record in iter_records(journal):
+        writer.write(record)
+    writer.close()
+
+
+class CsvWriter(Sink):
+    """Appends records to a typed csv in chunks of batch_size rows
+
+    Rows are flattened by to_typed over a declared window of growth years, so
+    every chunk has the growth_YYYY_MM columns of the header; growth of other
+    years is left out. A csv appended to must have been written with the same
+    years. The header is written with the first chunk, or on close if there
+    is none.
+    """
+
+    def __init__(self, path: Path, years: Iterable[int], scraped_at: datetime | None = None, batch_size: int = 1000):
+        self.path = path
+        self.years = sorted(years)
+        self.scraped_at = scraped_at
+        self.header = not path.exists() or path.stat().st_size == 0
+        self.batch_size = batch_size
+        self.records: list[dict] = []
+        self.callbacks: list[Callable[[], None]] = []
+
+    def write(self, record: dict, on_durable: Callable[[], None] | None = None):
+        self.records.append(record)
+        if on_durable is not None:
+            self.callbacks.append(on_durable)
+        if len(self.records) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.records or self.header:
+            typed = to_typed(SignalFrame.from_records(self.records), self.scraped_at, self.years)
+            with open(self.path, "a", newline="") as f:
+                typed.to_csv(f, header=self.header, index=False)
+                f.flush()
+                os.fsync(f.fileno())
+            self.header = False
+            self.records = []
+        callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def close(self):
+        self.flush()
+
+
+def read_typed(path: Path) -> pd.DataFrame:
+    """Reads a typed frame back with its dtypes, from parquet or from a csv written by write_csv"""
+    if path.suffix == ".parquet":
+        frame = pd.read_parquet(path)
+    else:
+        header = pd.read_csv(path, nrows=0).columns
+        dtypes = {name: dtype for name, dtype in DTYPES.items() if name not in TIME_COLUMNS}
+        dtypes.update({name: GROWTH_DTYPE for name in header if is_growth_column(name)})
+        frame = pd.read_csv(path, dtype=dtypes, parse_dates=[name for name in TIME_COLUMNS if name in header])
+    # Both come back at a finer unit than seconds.
+    for name in TIME_COLUMNS:
+        if name in frame:
+            frame[name] = pd.to_datetime(frame[name], utc=True).astype(DTYPES[name])
+    return frame
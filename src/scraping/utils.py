@@ -1,114 +1,114 @@
-import re
+import time
+from typing import TYPE_CHECKING
 
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.remote.webdriver import WebDriver
-from selenium.webdriver.remote.webelement import WebElement
+# The value parsers live in scraping.values, they are kept importable from here.
+from .values import extract_float, extract_int, extract_time, parse_value  # noqa: F401
+from .telemetry import Telemetry
 
+if TYPE_CHECKING:
+    from selenium.webdriver.remote.webdriver import WebDriver
+    from selenium.webdriver.remote.webelement import WebElement
 
-def waf_element(driver: WebDriver | WebElement, value: str, by: str = By.XPATH) -> WebElement:
-    """Wait until find element"""
-    return WebDriverWait(driver, 10).until(EC.presence_of_element_located((by, value)))
-    # Temporary, remove waiting
-    # return driver.find_element(by, value)
+# Values of selenium's By.XPATH / By.ID.
+XPATH = "xpath"
+ID = "id"
 
-def waf_elements(driver: WebDriver | WebElement, value: str, by: str = By.XPATH) -> list[WebElement]:
-    """Wait until find elements"""
-    return WebDriverWait(driver, 10).until(EC.presence_of_all_elements_located((by, value)))
-    # Temporary, remove waiting
-    # return driver.find_elements(by, value)
 
-def extract_float(text: str) -> float:
-    """Extracts a float from a text string
+class WaitPolicy:
+    """How long element lookups wait, and where that time goes
 
-    If the float is formatted with spaces, they are removed
-    If the integer is not a number, return 0.0
+    The page is waited for once, by `ready`: until document.readyState is
+    "complete" and the sentinel element (if any) is present. Lookups after
+    that wait at most the timeout of their field class, `required_timeout`
+    or `optional_timeout`. With a timeout of 0 a lookup is a single
+    find_elements call, so an optional field missing from the page costs
+    nothing.
 
-    Args:
-        text (str): Text with a float
-
-    Returns:
-        float: The extracted Float
-
-    Raises:
-        ValueError: If the float is not found in the text
-    
-    Example:
-        >>> extract_float("Total: 1 234.56")
-        1234.56
-    """
-    match = re.search(r"(\d{1,3}(?:\s\d{3})*(?:\.\d+)?)", text)
-    if not match:
-        if "n/a" in text:
-            return 0.0
-        raise ValueError(f"Float not found in {text}")
-    return float(match.group(1).replace(" ", ""))
-
-def extract_int(text: str) -> int:
-    """Extracts an integer from a text string
-
-    If the integer is formatted with spaces, they are removed
-    If the integer is not a number, return 0
-
-    Args:
-        text (str): Text with an integer
-
-    Returns:
-        int: The extracted Integer
-
-    Raises:
-        ValueError: If the integer is not found in the text
-    
-    Example:
-        >>> extract_int("Total: 1 234")
-        1234
+    The time taken by every lookup is observed as the "wait" stage of the
+    telemetry, labelled with the field, if one is given.
     """
-    match = re.search(r"(\d{1,3}(?:\s\d{3})*)", text)
-    if not match:
-        if "n/a" in text:
-            return 0
-        raise ValueError(f"Integer not found in {text}")
-    return int(match.group(1).replace(" ", ""))
-
-def extract_time(text: str) -> int:
-    """Extracts a time from a text string
-
-    Able to recognize multiple units of time, all converted to numerical values in minutes and return values.
-    The corresponding units are "year", "day", "hour", and "minute".
-    """
-    time_units = {
-        "year": 525600,
-        "day": 1440,
-        "hour": 60,
-        "minute": 1
-    }
-    time = 0
-    for unit, value in time_units.items():
-        match = re.search(r"(\d+)\s"+unit, text)
-        if match:
-            time += int(match.group(1)) * value
-    return time
-
-def parse_value(value):
-    time_units = {
-        "minutes": 1,
-        "hours": 60,
-        "days": 1440
-    }
-
-    def convert_to_minutes(time_str):
-        for unit, multiplier in time_units.items():
-            if unit in time_str:
-                number = re.findall(r"\d+", time_str)
-                if number:
-                    return int(number[0]) * multiplier
-        return None
-
-    number_match = re.search(r"-?\d+\.?\d*", value)
-    number = float(number_match.group(0)) if number_match else None
-
-    if any(unit in value for unit in time_units):
-        number = convert_to_minutes(value)
-
-    return number
+
+    def __init__(
+        self,
+        sentinel: tuple[str, str] | None = (ID, "growth_chart"),
+        ready_timeout: float = 10,
+        ready_poll: float = 0.1,
+        required_timeout: float = 10,
+        required_poll: float = 0.1,
+        optional_timeout: float = 0,
+        optional_poll: float = 0.1,
+        telemetry: Telemetry | None = None,
+    ):
+        self.sentinel = sentinel
+        self.ready_timeout = ready_timeout
+        self.ready_poll = ready_poll
+        self.required_timeout = required_timeout
+        self.required_poll = required_poll
+        self.optional_timeout = optional_timeout
+        self.optional_poll = optional_poll
+        self.telemetry = telemetry
+
+    def ready(self, driver: "WebDriver"):
+        """Waits until the page has loaded, raises TimeoutException if it doesn't in time"""
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        def _ready(driver: "WebDriver") -> bool:
+            if driver.execute_script("return document.readyState") != "complete":
+                return False
+            return self.sentinel is None or bool(driver.find_elements(*self.sentinel))
+
+        started = time.perf_counter()
+        try:
+            WebDriverWait(driver, self.ready_timeout, poll_frequency=self.ready_poll).until(_ready)
+        finally:
+            self._record("ready", time.perf_counter() - started)
+
+    def element(
+        self,
+        driver: "WebDriver | WebElement",
+        value: str,
+        by: str = XPATH,
+        field: str | None = None,
+        required: bool = True,
+    ) -> "WebElement | None":
+        """First element matching the locator
+
+        A required element that doesn't show up in time raises TimeoutException,
+        an optional one gives None.
+        """
+        found = self.elements(driver, value, by=by, field=field, required=required)
+        return found[0] if found else None
+
+    def elements(
+        self,
+        driver: "WebDriver | WebElement",
+        value: str,
+        by: str = XPATH,
+        field: str | None = None,
+        required: bool = True,
+    ) -> "list[WebElement]":
+        """All elements matching the locator, waiting until there is at least one"""
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        timeout = self.required_timeout if required else self.optional_timeout
+        poll = self.required_poll if required else self.optional_poll
+        started = time.perf_counter()
+        try:
+            found = driver.find_elements(by, value)
+            if not found and timeout > 0:
+                try:
+                    found = WebDriverWait(driver, timeout, poll_frequency=poll).until(
+                        lambda driver: driver.find_elements(by, value)
+                    )
+                except TimeoutException:
+                    found = []
+        finally:
+            self._record(field or value, time.perf_counter() - started)
+        if not found and required:
+            raise TimeoutException(f"Element not found: {value}")
+        return found
+
+    def _record(self, field: str, seconds: float):
+        if self.telemetry is not None:
+            self.telemetry.observe("wait", seconds, field=field)
@@ -0,0 +1,175 @@
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+FLOAT_RE = re.compile(r"(\d{1,3}(?:\s\d{3})*(?:\.\d+)?)")
+INT_RE = re.compile(r"(\d{1,3}(?:\s\d{3})*)")
+NUMBER_RE = re.compile(r"(-?\d+\.?\d*)")
+DIGITS_RE = re.compile(r"(\d+)")
+TIME_RE = re.compile(r"(\d+)\s(year|day|hour|minute)")
+SUFFIXED_RE = re.compile(r"(\d+[KM]*)")
+
+# Minutes per unit, in the order extract_time and parse_value look for them.
+TIME_UNITS = {
+    "year": 525600,
+    "day": 1440,
+    "hour": 60,
+    "minute": 1,
+}
+TIME_UNIT_RES = {unit: re.compile(rf"(\d+)\s{unit}") for unit in TIME_UNITS}
+# Minutes per unit of a stats duration such as "1 day ago" or "3 weeks ago". A month counts as 30 days.
+DURATION_UNITS = {
+    "minute": 1,
+    "hour": 60,
+    "day": 1440,
+    "week": 10080,
+    "month": 43200,
+    "year": 525600,
+}
+DURATION_RE = re.compile(rf"(\d+)\s*({'|'.join(DURATION_UNITS)})s?\b")
+SUFFIXES = {
+    "K": 1000,
+    "M": 1000000,
+}
+
+
+def extract_float(text: str) -> float:
+    """Extracts a float from a text string
+
+    If the float is formatted with spaces, they are removed
+    If the integer is not a number, return 0.0
+
+    Args:
+        text (str): Text with a float
+
+    Returns:
+        float: The extracted Float
+
+    Raises:
+        ValueError: If the float is not found in the text
+
+    Example:
+        >>> extract_float("Total: 1 234.56")
+        1234.56
+    """
+    match = FLOAT_RE.search(text)
+    if not match:
+        if "n/a" in text:
+            return 0.0
+        raise ValueError(f"Float not found in {text}")
+    return float(match.group(1).replace(" ", ""))
+
+def extract_int(text: str) -> int:
+    """Extracts an integer from a text string
+
+    If the integer is formatted with spaces, they are removed
+    If the integer is not a number, return 0
+
+    Args:
+        text (str): Text with an integer
+
+    Returns:
+        int: The extracted Integer
+
+    Raises:
+        ValueError: If the integer is not found in the text
+
+    Example:
+        >>> extract_int("Total: 1 234")
+        1234
+    """
+    match = INT_RE.search(text)
+    if not match:
+        if "n/a" in text:
+            return 0
+        raise ValueError(f"Integer not found in {text}")
+    return int(match.group(1).replace(" ", ""))
+
+def extract_time(text: str) -> int:
+    """Extracts a time from a text string
+
+    Able to recognize multiple units of time, all converted to numerical values in minutes and return values.
+    The corresponding units are "year", "day", "hour", and "minute".
+    Only the first amount of each unit counts.
+    """
+    time = 0
+    seen = set()
+    for match in TIME_RE.finditer(text):
+        unit = match.group(2)
+        if unit not in seen:
+            seen.add(unit)
+            time += int(match.group(1)) * TIME_UNITS[unit]
+    return time
+
+def extract_suffixed(text: str) -> int:
+    """Extracts an integer with an optional K (thousand) / M (million) suffix
+
+    Example:
+        >>> extract_suffixed("12K USD")
+        12000
+    """
+    match = SUFFIXED_RE.search(text)
+    if not match:
+        raise ValueError(f"Number not found in {text}")
+    number = match.group(1)
+    for suffix, multiplier in SUFFIXES.items():
+        if suffix in number:
+            return int(float(number.replace(suffix, "")) * multiplier)
+    return int(number)
+
+def parse_duration(text: str) -> int | None:
+    """Minutes of the first duration in a text, None if it has none
+
+    Example:
+        >>> parse_duration("3 weeks ago")
+        30240
+    """
+    match = DURATION_RE.search(text)
+    if not match:
+        return None
+    return int(match.group(1)) * DURATION_UNITS[match.group(2)]
+
+def parse_value(value):
+    """Parses a stats value to a float, or to minutes if it is a duration
+
+    Returns None if the value has no number.
+    """
+    minutes = parse_duration(value)
+    if minutes is not None:
+        return minutes
+    number = NUMBER_RE.search(value)
+    return float(number.group(1)) if number else None
+
+
+def parse_series(series: "pd.Series", kind: str = "value") -> "pd.Series":
+    """Parses a whole column of raw strings at once
+
+    kind selects the parser the column is run through, with the same rules as
+    the scalar function: "value" (parse_value), "float" (extract_float),
+    "int" (extract_int) or "time" (extract_time). Instead of raising, strings
+    without a number become NaN ("n/a" still gives 0 for float / int).
+    """
+    import numpy as np
+    import pandas as pd
+
+    series = series.astype("string")
+    if kind == "value":
+        result = pd.to_numeric(series.str.extract(NUMBER_RE, expand=False), errors="coerce")
+        durations = series.str.extract(DURATION_RE)
+        minutes = pd.to_numeric(durations[0], errors="coerce") * durations[1].map(DURATION_UNITS).astype("float64")
+        return result.mask(minutes.notna(), minutes).astype("float64")
+    if kind in ("float", "int"):
+        pattern = FLOAT_RE if kind == "float" else INT_RE
+        result = pd.to_numeric(series.str.extract(pattern, expand=False).str.replace(" ", ""), errors="coerce")
+        na = series.str.contains("n/a", regex=False).fillna(False).to_numpy(dtype=bool)
+        return result.mask(result.isna().to_numpy() & na, 0).astype("float64")
+    if kind == "time":
+        result = pd.Series(np.zeros(len(series)), index=series.index)
+        for unit, minutes in TIME_UNITS.items():
+            amount = series.str.extract(TIME_UNIT_RES[unit], expand=False)
+            result += pd.to_numeric(amount, errors="coerce").fillna(0).to_numpy() * minutes
+        return result
+    raise ValueError(f"Unknown kind: {kind}")
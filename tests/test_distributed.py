@@ -0,0 +1,86 @@
+import json
+import time
+from pathlib import Path
+
+from scraping.distributed import DONE, FAILED, WorkQueue, merge_partitions, partition_dir
+from scraping.storage import JsonlWriter, from_row
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+LEASE = 0.3
+URLS = [f"https://www.mql5.com/en/signals/{i}" for i in range(3)]
+
+
+def _queue(path: Path, worker: str, **kwargs) -> WorkQueue:
+    queue = WorkQueue(path, worker, lease_timeout=LEASE, **kwargs)
+    queue.add_links(URLS)
+    return queue
+
+
+def test_expired_lease_is_reclaimed(tmp_path):
+    a = _queue(tmp_path / "queue.db", "a")
+    b = _queue(tmp_path / "queue.db", "b")
+    assert a.claim(2) == URLS[:2]
+    assert b.claim(2) == URLS[2:]
+    assert b.leased() == 3
+
+    time.sleep(2 * LEASE)
+    assert b.leased() == 0
+    assert b.claim(3) == URLS
+    # a lost its lease, its late result doesn't count.
+    a.mark_done(URLS[0])
+    b.mark_done(URLS[1])
+    assert dict(b.conn.execute("SELECT url, lease_owner FROM tasks WHERE status = 'leased'")) == {
+        URLS[0]: "b",
+        URLS[2]: "b",
+    }
+    assert b.summary()[DONE] == 1
+    a.close()
+    b.close()
+
+
+def test_url_is_given_up_after_max_attempts(tmp_path):
+    queue = _queue(tmp_path / "queue.db", "a", max_attempts=2)
+    for _ in range(2):
+        assert queue.claim(1) == URLS[:1]
+        time.sleep(2 * LEASE)
+    assert queue.claim(1) == URLS[1:2]
+    status, reason, attempts = queue.conn.execute(
+        "SELECT status, reason, attempts FROM tasks WHERE url = ?", (URLS[0],)
+    ).fetchone()
+    assert (status, reason, attempts) == (FAILED, "lease expired", 2)
+    queue.close()
+
+
+def test_failed_url_waits_for_retry_delay(tmp_path):
+    queue = _queue(tmp_path / "queue.db", "a", retry_delay=2 * LEASE)
+    assert queue.claim(1) == URLS[:1]
+    queue.mark_failed(URLS[0], "timeout")
+    assert queue.waiting() == 1
+    assert queue.claim(3) == URLS[1:]
+    queue.mark_done(URLS[1])
+    queue.mark_done(URLS[2])
+    assert queue.claim(1) == []
+
+    time.sleep(3 * LEASE)
+    assert queue.waiting() == 0
+    assert queue.claim(1) == URLS[:1]
+    queue.close()
+
+
+def test_merge_partitions_keeps_one_record_per_url(tmp_path):
+    record = from_row(json.loads((FIXTURES / "signal.json").read_text()))
+    parts = {"a": [(URLS[0], "first"), (URLS[1], "a")], "b": [(URLS[0], "second")]}
+    for worker, rows in parts.items():
+        directory = partition_dir(tmp_path, worker)
+        directory.mkdir()
+        writer = JsonlWriter(directory / "part-00000.jsonl")
+        for url, name in rows:
+            writer.write({**record, "url": url, "name": name})
+        writer.close()
+    # A worker crashed while writing the last url.
+    with open(partition_dir(tmp_path, "b") / "part-00000.jsonl", "a") as f:
+        f.write(f'{{"url": "{URLS[2]}", "na')
+
+    merged = list(merge_partitions(tmp_path, [URLS[1], URLS[0], URLS[2]]))
+    assert [(record["url"], record["name"]) for record in merged] == [(URLS[1], "a"), (URLS[0], "second")]
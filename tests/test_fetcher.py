@@ -0,0 +1,66 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from scraping.archive import ArchivingFetcher, PageArchive
+from scraping.fetcher import HttpFetcher
+
+
+PAGE = "<html><body>signal</body></html>"
+ETAG = '"v1"'
+
+
+class _Handler(BaseHTTPRequestHandler):
+    requests: list[str | None] = []
+
+    def do_GET(self):
+        self.requests.append(self.headers.get("If-None-Match"))
+        if self.headers.get("If-None-Match") == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = PAGE.encode()
+        self.send_response(200)
+        self.send_header("ETag", ETAG)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/en/signals/1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_http_fetcher_revalidates(server):
+    fetcher = HttpFetcher()
+    page, validators = fetcher.fetch(server)
+    assert page == PAGE
+    assert validators == {"If-None-Match": ETAG}
+    assert fetcher.fetch(server, validators) == (None, validators)
+    fetcher.close()
+
+
+def test_archive_serves_unchanged_pages_across_runs(server, tmp_path):
+    for _ in range(2):
+        archive = PageArchive(tmp_path)
+        fetcher = ArchivingFetcher(HttpFetcher(), archive)
+        assert fetcher.get(server) == PAGE
+        fetcher.close()
+        archive.close()
+    assert _Handler.requests == [None, ETAG]
+
+    archive = PageArchive(tmp_path)
+    # The revalidation counts as a fetch of the archived page.
+    assert archive.conn.execute("SELECT COUNT(*) FROM pages").fetchone() == (2,)
+    archive.close()
@@ -0,0 +1,44 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from scraping.parser import parse_signal
+from scraping.storage import from_row
+
+
+# signal.html is a hand-written page with the layout of an mql5 signal page,
+# signal.json is the record parse_signal gave for it. The test catches
+# changes of the parser output, not differences from the live site.
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _page() -> str:
+    return (FIXTURES / "signal.html").read_text()
+
+def _expected() -> dict:
+    return from_row(json.loads((FIXTURES / "signal.json").read_text()))
+
+
+def test_parse_signal_matches_snapshot():
+    assert parse_signal(_page()).record() == _expected()
+
+
+@pytest.mark.parametrize("page_source", [False, True])
+def test_webdriver_path_on_fixture_page(page_source):
+    pytest.importorskip("selenium")
+    from selenium.common.exceptions import WebDriverException
+
+    from scraping.fetcher import create_driver
+    from scraping.scraper import SignalScrapper
+
+    try:
+        driver = create_driver(headless=True)
+    except WebDriverException as e:
+        pytest.skip(f"Chrome is not available: {e.msg}")
+    ss = SignalScrapper(driver, page_source=page_source)
+    try:
+        signal = ss.scrape_url((FIXTURES / "signal.html").as_uri())
+    finally:
+        driver.quit()
+    assert signal.record() == parse_signal(_page()).record()
@@ -0,0 +1,125 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from scraping import scheduler
+from scraping.fetcher import FetchError
+from scraping.scheduler import CrawlScheduler, TokenBucket
+from scraping.telemetry import Telemetry
+
+
+_sleep = asyncio.sleep
+
+
+class FakeClock:
+    """Stands in for the scheduler's clock, sleeping only moves it forward"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+        await _sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(scheduler, "time", SimpleNamespace(monotonic=clock.monotonic, perf_counter=clock.monotonic))
+    monkeypatch.setattr(asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def fake_fetch(statuses: list[int]):
+    """Job failing with the given statuses in turn, then giving the page"""
+    calls = []
+
+    def fetch(url: str) -> str:
+        calls.append(url)
+        if len(calls) <= len(statuses):
+            raise FetchError(url, statuses[len(calls) - 1])
+        return f"page of {url}"
+
+    return fetch, calls
+
+
+def test_rate_is_cut_on_throttling_and_recovers(clock):
+    bucket = TokenBucket(rate=10)
+    bucket.throttled(backoff=5)
+    assert bucket.rate == 5
+    bucket.throttled(backoff=5)
+    assert bucket.rate == 2.5
+
+    # Jobs resume once the pause is over, then take a token every 1 / rate.
+    asyncio.run(bucket.acquire())
+    assert clock.now == pytest.approx(5)
+    asyncio.run(bucket.acquire())
+    assert clock.now == pytest.approx(5 + 1 / 2.5)
+
+    for rate in (3.5, 4.5, 5.5, 6.5, 7.5, 8.5, 9.5, 10, 10):
+        bucket.success()
+        assert bucket.rate == pytest.approx(rate)
+
+    for _ in range(20):
+        bucket.throttled(backoff=0)
+    assert bucket.rate == bucket.min_rate
+
+
+def test_throttled_job_backs_off_and_retries(clock):
+    telemetry = Telemetry()
+    crawl = CrawlScheduler(rate=10, backoff=1, telemetry=telemetry)
+    fetch, calls = fake_fetch([429, 503])
+    url = "https://www.mql5.com/en/signals/1"
+
+    assert crawl.call(url, fetch) == f"page of {url}"
+    assert len(calls) == 3
+    # Backoff doubles per retry, the pauses add up to 1 + 2 seconds.
+    assert clock.now >= 3
+    assert crawl.limiter.bucket(url).rate == pytest.approx(10 / 4 + 1)
+    assert telemetry.counters["retries", (("kind", "waf_block"),)] == 1
+    assert telemetry.counters["retries", (("kind", "http_error"),)] == 1
+
+
+def test_retries_are_capped(clock):
+    crawl = CrawlScheduler(rate=10, max_retries=2, backoff=1)
+    fetch, calls = fake_fetch([503] * 10)
+    with pytest.raises(FetchError):
+        crawl.call("https://www.mql5.com/en/signals/1", fetch)
+    assert len(calls) == 3
+
+
+def test_other_errors_are_not_retried(clock):
+    crawl = CrawlScheduler(rate=10, backoff=1)
+    fetch, calls = fake_fetch([404])
+    with pytest.raises(FetchError):
+        crawl.call("https://www.mql5.com/en/signals/1", fetch)
+    assert len(calls) == 1
+    assert clock.now < 1
+
+
+def test_closing_iter_results_cancels_pending_jobs(clock):
+    crawl = CrawlScheduler(concurrency=2, rate=100)
+    urls = [f"https://www.mql5.com/en/signals/{i}" for i in range(100)]
+    calls = []
+    lock = threading.Lock()
+
+    def fetch(url: str) -> str:
+        with lock:
+            calls.append(url)
+        return url
+
+    results = crawl.iter_results(urls, fetch)
+    url, page, error = next(results)
+    assert error is None and page == url
+    results.close()
+
+    # Besides the yielded job, only the ones running or waiting in the
+    # bounded hand-over queue (2 * concurrency) were started.
+    assert len(calls) <= 1 + 3 * crawl.concurrency
@@ -0,0 +1,34 @@
+import json
+from pathlib import Path
+
+from scraping.storage import JsonlWriter, from_row, iter_records, load_frame
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _record(url: str, name: str) -> dict:
+    record = from_row(json.loads((FIXTURES / "signal.json").read_text()))
+    return {**record, "url": url, "name": name}
+
+
+def test_resumed_journal_keeps_last_record_per_url(tmp_path):
+    path = tmp_path / "output.dat"
+    writer = JsonlWriter(path)
+    writer.write(_record("https://www.mql5.com/en/signals/1", "first"))
+    writer.write(_record("https://www.mql5.com/en/signals/2", "second"))
+    writer.close()
+    # A crash cut the last line short.
+    with open(path, "a") as f:
+        f.write('{"url": "https://www.mql5.com/en/signals/3", "na')
+
+    writer = JsonlWriter(path)
+    writer.write(_record("https://www.mql5.com/en/signals/1", "again"))
+    writer.close()
+
+    records = list(iter_records(path))
+    assert [(record["url"], record["name"]) for record in records] == [
+        ("https://www.mql5.com/en/signals/2", "second"),
+        ("https://www.mql5.com/en/signals/1", "again"),
+    ]
+    assert load_frame(path)["name"].tolist() == ["second", "again"]
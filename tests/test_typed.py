@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+
+from scraping.storage import JsonlWriter, from_row
+from scraping.typed import CsvWriter, growth_column, read_typed, write_csv
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _records() -> list[dict]:
+    record = from_row(json.loads((FIXTURES / "signal.json").read_text()))
+    return [{**record, "url": f"https://www.mql5.com/en/signals/{i}", "fetched_at": 1.7e9} for i in range(5)]
+
+
+def test_csv_writer_writes_chunks_over_declared_years(tmp_path):
+    path = tmp_path / "signals.csv"
+    durable = []
+    writer = CsvWriter(path, [2024, 2025], batch_size=2)
+    for i, record in enumerate(_records()):
+        writer.write(record, lambda i=i: durable.append(i))
+    assert durable == [0, 1, 2, 3]
+    writer.close()
+    assert durable == [0, 1, 2, 3, 4]
+
+    frame = read_typed(path)
+    assert len(frame) == 5
+    growth = [name for name in frame.columns if name.startswith("growth_2")]
+    assert growth == [growth_column(year, month) for year in (2024, 2025) for month in range(1, 13)]
+    assert frame["growth_2025_01"].isna().all()
+
+
+def test_write_csv_matches_csv_writer(tmp_path):
+    journal = tmp_path / "output.dat"
+    writer = JsonlWriter(journal)
+    for record in _records():
+        writer.write(record)
+    writer.close()
+
+    write_csv(tmp_path / "a.csv", journal, chunk_size=2)
+    csv_writer = CsvWriter(tmp_path / "b.csv", [2023, 2024])
+    for record in _records():
+        csv_writer.write(record)
+    csv_writer.close()
+    pd.testing.assert_frame_equal(read_typed(tmp_path / "a.csv"), read_typed(tmp_path / "b.csv"))
+
+
+def test_empty_csv_has_a_header(tmp_path):
+    path = tmp_path / "signals.csv"
+    CsvWriter(path, [2024]).close()
+    assert read_typed(path).empty
+    assert "growth_2024_12" in read_typed(path).columns
@@ -0,0 +1,45 @@
+import json
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from scraping.model import SignalFrame
+from scraping.storage import from_row
+from scraping.typed import to_typed
+from scraping.values import parse_series, parse_value
+
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+DURATIONS = [
+    ("1 day ago", timedelta(days=1)),
+    ("2 hours ago", timedelta(hours=2)),
+    ("3 weeks ago", timedelta(weeks=3)),
+    ("1 minute ago", timedelta(minutes=1)),
+    ("45 minutes", timedelta(minutes=45)),
+]
+
+
+@pytest.mark.parametrize("text, duration", DURATIONS)
+def test_parse_value_reads_durations_in_minutes(text, duration):
+    assert parse_value(text) == duration / timedelta(minutes=1)
+
+
+def test_parse_series_reads_durations_like_parse_value():
+    texts = [text for text, _ in DURATIONS] + ["12.5%", "n/a"]
+    parsed = parse_series(pd.Series(texts))
+    assert parsed.tolist()[:-1] == [parse_value(text) for text in texts[:-1]]
+    assert pd.isna(parsed.iloc[-1])
+
+
+def test_latest_trade_is_counted_back_from_fetched_at():
+    fetched_at = datetime(2024, 5, 1, 12, tzinfo=timezone.utc)
+    record = from_row(json.loads((FIXTURES / "signal.json").read_text()))
+    records = [
+        {**record, "fetched_at": fetched_at.timestamp(), "latest_trade": parse_value(text)}
+        for text, _ in DURATIONS
+    ]
+    typed = to_typed(SignalFrame.from_records(records))
+    assert typed["latest_trade"].tolist() == [pd.Timestamp(fetched_at - duration) for _, duration in DURATIONS]